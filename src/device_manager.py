@@ -1,13 +1,62 @@
 import json
-import uuid
 import os
-import hashlib
-import platform
+import time
+import threading
 from pathlib import Path
-from datetime import datetime
 from system_logger import system_logger, log_debug, log_info, log_warning, log_error, log_success
 
+# orjson é opcional: serializa/parseia o device_id.json em C; sem ele usa o json padrão
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Serializa a criação/validação do Device ID entre threads. É global porque o
+# cache de verificação (system_logger) também é compartilhado entre instâncias.
+_device_id_lock = threading.Lock()
+
+# Campos (e ordem) que compõem o hash do hardware; alterar muda o Device ID
+_HARDWARE_ID_FIELDS = ('platform', 'processor', 'architecture', 'machine', 'node')
+
+
+def _dumps_device_data(device_data):
+    """Serializa os dados do dispositivo em bytes UTF-8 (mesmo formato com ou sem orjson)."""
+    if orjson is not None:
+        return orjson.dumps(device_data, option=orjson.OPT_INDENT_2)
+    return json.dumps(device_data, indent=2, ensure_ascii=False).encode('utf-8')
+
+
+def _device_id_from_hash(hardware_hash):
+    """Device ID (UUID5) derivado do hash do hardware."""
+    import uuid
+    
+    return str(uuid.uuid5(uuid.NAMESPACE_DNS, hardware_hash))
+
+
+def _isoformat_now():
+    """
+    Timestamp local no mesmo formato de datetime.now().isoformat(),
+    montado direto a partir de time.time_ns() (sem importar datetime).
+    """
+    now_ns = time.time_ns()
+    seconds, nanoseconds = divmod(now_ns, 1_000_000_000)
+    return time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(seconds)) + f'.{nanoseconds // 1000:06d}'
+
+
+def _loads_device_data(payload):
+    """Parseia o conteúdo (bytes) do arquivo de dispositivo."""
+    if orjson is not None:
+        return orjson.loads(payload)
+    return json.loads(payload)
+
+
 class DeviceManager:
+    __slots__ = (
+        'config_dir', 'device_file',
+        '_hw_id_cache', '_hw_hash_cache', '_platform_cache',
+        '_file_cache', '_file_mtime',
+    )
+    
     def __init__(self, config_dir=None):
         """
         Inicializa o gerenciador de dispositivo.
@@ -23,50 +72,202 @@ class DeviceManager:
         self.config_dir = Path(config_dir)
         self.device_file = self.config_dir / "device_id.json"
         
+        # Cache do ID de hardware (não muda durante a execução do processo)
+        self._hw_id_cache = None
+        self._hw_hash_cache = None
+        self._platform_cache = None
+        
+        # Cache do conteúdo do device_id.json (invalidado pelo mtime do arquivo)
+        self._file_cache = None
+        self._file_mtime = None
+        
         # Cria o diretório se não existir
         self.config_dir.mkdir(exist_ok=True)
         
+    def _collect_platform(self):
+        """
+        Coleta uma única vez as informações de plataforma usadas pelo Device ID
+        e pelo arquivo de configuração.
+        
+        Returns:
+            dict: Informações da plataforma
+        """
+        if self._platform_cache is None:
+            import platform
+            
+            if hasattr(os, 'uname'):
+                # POSIX: uma única chamada uname() traz sistema, host, release,
+                # versão e máquina (os mesmos valores de platform.*)
+                uname = os.uname()
+                system, node, release, version, machine = (
+                    uname.sysname, uname.nodename, uname.release, uname.version, uname.machine
+                )
+            else:
+                system, node, release, version, machine = (
+                    platform.system(), platform.node(), platform.release(),
+                    platform.version(), platform.machine()
+                )
+            
+            # platform/processor/architecture continuam vindo do módulo platform,
+            # pois compõem o hash do Device ID
+            self._platform_cache = {
+                'platform': platform.platform(),
+                'processor': platform.processor(),
+                'architecture': platform.architecture()[0],
+                'machine': machine,
+                'node': node,
+                'system': system,
+                'release': release,
+                'version': version,
+            }
+        return self._platform_cache
+        
+    def _load_device_file(self):
+        """
+        Carrega o device_id.json, reutilizando o conteúdo já parseado enquanto
+        o mtime do arquivo não mudar.
+        
+        Returns:
+            dict: Conteúdo do arquivo de dispositivo ou None se o arquivo não existe
+        """
+        try:
+            mtime = os.stat(self.device_file).st_mtime_ns
+            if self._file_cache is not None and self._file_mtime == mtime:
+                return self._file_cache
+            
+            payload = self.device_file.read_bytes()
+        except FileNotFoundError:
+            self._invalidate_file_cache()
+            return None
+        
+        device_data = _loads_device_data(payload)
+        
+        self._file_cache = device_data
+        self._file_mtime = mtime
+        return device_data
+    
+    def _write_device_file(self, device_info):
+        """
+        Grava o device_id.json e já deixa o conteúdo em cache, evitando
+        reler e parsear o arquivo recém-criado.
+        
+        A gravação é atômica (arquivo temporário + fsync + os.replace), para que
+        uma queda de energia não deixe o arquivo corrompido.
+        
+        Args:
+            device_info (dict): Informações do dispositivo
+        """
+        self._invalidate_file_cache()
+        payload = memoryview(_dumps_device_data(device_info))
+        
+        tmp_file = self.device_file.with_name(self.device_file.name + ".tmp")
+        # O_BINARY (Windows) evita a conversão de \n em \r\n
+        flags = os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, 'O_BINARY', 0)
+        fd = os.open(tmp_file, flags, 0o644)
+        try:
+            try:
+                # os.write pode gravar só parte dos bytes: repete até o payload inteiro
+                while payload:
+                    payload = payload[os.write(fd, payload):]
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+            os.replace(tmp_file, self.device_file)
+        except Exception:
+            # Gravação incompleta (ex.: disco cheio): o arquivo válido anterior fica intacto
+            try:
+                os.unlink(tmp_file)
+            except OSError:
+                pass
+            raise
+        
+        self._file_cache = device_info
+        self._file_mtime = os.stat(self.device_file).st_mtime_ns
+    
+    def _invalidate_file_cache(self):
+        """Descarta o conteúdo em cache do device_id.json."""
+        self._file_cache = None
+        self._file_mtime = None
+    
+    def _generate_hardware_hash(self):
+        """
+        Gera o hash SHA256 (hex) das características do hardware, base do Device ID.
+        O resultado é memoizado na instância, já que o hardware não muda em execução.
+        """
+        if self._hw_hash_cache is not None:
+            return self._hw_hash_cache
+        
+        import hashlib
+        
+        # Coleta informações únicas do sistema
+        platform_info = self._collect_platform()
+        
+        # Gera um hash SHA256 das informações do hardware, alimentando o hasher
+        # campo a campo (sem montar string/bytes intermediários)
+        # IMPORTANTE: SHA256 + UUID5 e a concatenação sem separador são mantidos
+        # para que dispositivos já cadastrados continuem gerando o mesmo Device ID
+        # hashlib.sha256 já usa a implementação do OpenSSL (com SHA-NI quando a CPU
+        # suporta); trocar por blake3 mudaria o Device ID
+        hasher = hashlib.sha256()
+        for field in _HARDWARE_ID_FIELDS:
+            hasher.update(str(platform_info[field]).encode())
+        self._hw_hash_cache = hasher.hexdigest()
+        return self._hw_hash_cache
+    
     def _generate_hardware_id(self):
         """
         Gera um ID baseado em características do hardware do dispositivo.
         Isso garante que mesmo se o arquivo for perdido, o mesmo ID será gerado.
+        O resultado é memoizado na instância, já que o hardware não muda em execução.
         """
-        # Coleta informações únicas do sistema
-        system_info = {
-            'platform': platform.platform(),
-            'processor': platform.processor(),
-            'architecture': platform.architecture()[0],
-            'machine': platform.machine(),
-            'node': platform.node(),
-        }
-        
-        # Cria uma string única baseada nas informações do sistema
-        hardware_string = ''.join(str(value) for value in system_info.values())
-        
-        # Gera um hash SHA256 das informações do hardware
-        hardware_hash = hashlib.sha256(hardware_string.encode()).hexdigest()
+        if self._hw_id_cache is not None:
+            return self._hw_id_cache
         
         # Converte o hash em um UUID determinístico
-        device_uuid = str(uuid.uuid5(uuid.NAMESPACE_DNS, hardware_hash))
+        device_uuid = _device_id_from_hash(self._generate_hardware_hash())
         
+        self._hw_id_cache = device_uuid
         return device_uuid
     
+    def _matches_current_hardware(self, device_data):
+        """
+        Verifica se os dados do arquivo pertencem ao hardware atual.
+        
+        Arquivos com 'hardware_hash' comparam o hash com o do hardware atual e
+        conferem o Device ID gravado com o UUID derivado desse hash (um
+        device_id editado no arquivo não passa); arquivos antigos (sem o campo)
+        comparam o Device ID completo.
+        
+        Args:
+            device_data (dict): Conteúdo do device_id.json
+            
+        Returns:
+            bool: True se corresponde ao hardware atual
+        """
+        stored_hash = device_data.get('hardware_hash')
+        if stored_hash:
+            return (stored_hash == self._generate_hardware_hash()
+                    and device_data.get('device_id') == _device_id_from_hash(stored_hash))
+        return device_data.get('device_id') == self._generate_hardware_id()
+    
     def _create_device_info(self):
         """
         Cria as informações completas do dispositivo.
         """
         device_id = self._generate_hardware_id()
+        platform_info = self._collect_platform()
         
         device_info = {
             "device_id": device_id,
-            "created_at": datetime.now().isoformat(),
-            "platform": platform.platform(),
-            "system": platform.system(),
-            "release": platform.release(),
-            "version": platform.version(),
-            "machine": platform.machine(),
-            "processor": platform.processor(),
-            "hostname": platform.node(),
+            "hardware_hash": self._generate_hardware_hash(),
+            "created_at": _isoformat_now(),
+            "platform": platform_info['platform'],
+            "system": platform_info['system'],
+            "release": platform_info['release'],
+            "version": platform_info['version'],
+            "machine": platform_info['machine'],
+            "processor": platform_info['processor'],
+            "hostname": platform_info['node'],
             "immutable": True,
             "description": "Device ID único e imutável para sistema de câmeras de segurança"
         }
@@ -83,54 +284,20 @@ class DeviceManager:
             str: Device ID único do dispositivo
         """
         try:
-            # Verifica se já foi verificado no cache
+            # Verifica se já foi verificado no cache (caminho rápido, sem lock)
             cached_device_id = system_logger.get_cached_verification('device_id')
             if cached_device_id:
-                log_debug(f"Device ID do cache: {system_logger.get_device_id_short(cached_device_id)}")
+                if system_logger.is_debug_enabled():
+                    log_debug(f"Device ID do cache: {system_logger.get_device_id_short(cached_device_id)}")
                 return cached_device_id
             
-            # Verifica se o arquivo já existe
-            if self.device_file.exists():
-                # Carrega o arquivo existente
-                with open(self.device_file, 'r', encoding='utf-8') as file:
-                    device_data = json.load(file)
+            with _device_id_lock:
+                # Outra thread pode ter resolvido o ID enquanto esperávamos o lock
+                cached_device_id = system_logger.get_cached_verification('device_id')
+                if cached_device_id:
+                    return cached_device_id
                 
-                # Verifica se o device_id existe e é válido
-                if 'device_id' in device_data and device_data['device_id']:
-                    device_id = device_data['device_id']
-                    log_debug(f"Device ID encontrado: {device_id}")
-                    
-                    # Verifica a integridade comparando com o hardware atual
-                    expected_id = self._generate_hardware_id()
-                    if device_id == expected_id:
-                        log_debug("Integridade do Device ID verificada com sucesso!")
-                        # Armazena no cache
-                        system_logger.cache_verification('device_id', device_id, 
-                                                       f"Device ID verificado: {system_logger.get_device_id_short(device_id)}")
-                        return device_id
-                    else:
-                        log_warning("Device ID no arquivo não corresponde ao hardware atual!")
-                        log_warning("Isso pode indicar que o arquivo foi copiado de outro dispositivo.")
-                        # Armazena no cache mesmo assim
-                        system_logger.cache_verification('device_id', device_id)
-                        return device_id  # Mantém o ID original mesmo assim
-            
-            # Se chegou aqui, precisa criar um novo Device ID
-            log_info("Criando novo Device ID...")
-            device_info = self._create_device_info()
-            
-            # Salva no arquivo
-            with open(self.device_file, 'w', encoding='utf-8') as file:
-                json.dump(device_info, file, indent=4, ensure_ascii=False)
-            
-            device_id = device_info['device_id']
-            log_success(f"Novo Device ID criado: {system_logger.get_device_id_short(device_id)}")
-            log_debug(f"Arquivo salvo em: {self.device_file.absolute()}")
-            
-            # Armazena no cache
-            system_logger.cache_verification('device_id', device_id)
-            
-            return device_id
+                return self._load_or_create_device_id()
             
         except Exception as e:
             log_error(f"Erro ao gerenciar Device ID: {e}")
@@ -139,6 +306,58 @@ class DeviceManager:
             system_logger.cache_verification('device_id', fallback_id)
             return fallback_id
     
+    def _load_or_create_device_id(self):
+        """
+        Carrega e valida o Device ID do arquivo ou cria um novo.
+        Deve ser chamado com _device_id_lock adquirido.
+        
+        Returns:
+            str: Device ID único do dispositivo
+        """
+        # Carrega o arquivo existente (None se ainda não existe)
+        device_data = self._load_device_file()
+        if device_data is not None:
+            # Verifica se o device_id existe e é válido
+            if 'device_id' in device_data and device_data['device_id']:
+                device_id = device_data['device_id']
+                log_debug(f"Device ID encontrado: {device_id}")
+                
+                # Verifica a integridade comparando com o hardware atual
+                if self._matches_current_hardware(device_data):
+                    log_debug("Integridade do Device ID verificada com sucesso!")
+                    # Armazena no cache
+                    system_logger.cache_verification('device_id_integrity', True)
+                    message = None
+                    if system_logger.is_debug_enabled():
+                        message = f"Device ID verificado: {system_logger.get_device_id_short(device_id)}"
+                    system_logger.cache_verification('device_id', device_id, message)
+                    return device_id
+                else:
+                    log_warning("Device ID no arquivo não corresponde ao hardware atual!")
+                    log_warning("Isso pode indicar que o arquivo foi copiado de outro dispositivo.")
+                    # Armazena no cache mesmo assim
+                    system_logger.cache_verification('device_id_integrity', False)
+                    system_logger.cache_verification('device_id', device_id)
+                    return device_id  # Mantém o ID original mesmo assim
+        
+        # Se chegou aqui, precisa criar um novo Device ID
+        log_info("Criando novo Device ID...")
+        device_info = self._create_device_info()
+        
+        # Salva no arquivo
+        self._write_device_file(device_info)
+        
+        device_id = device_info['device_id']
+        log_success(f"Novo Device ID criado: {system_logger.get_device_id_short(device_id)}")
+        if system_logger.is_debug_enabled():
+            log_debug(f"Arquivo salvo em: {self.device_file.absolute()}")
+        
+        # Armazena no cache (ID recém-gerado a partir do hardware atual)
+        system_logger.cache_verification('device_id_integrity', True)
+        system_logger.cache_verification('device_id', device_id)
+        
+        return device_id
+    
     def get_device_info(self):
         """
         Retorna todas as informações do dispositivo.
@@ -147,14 +366,14 @@ class DeviceManager:
             dict: Informações completas do dispositivo
         """
         try:
-            if self.device_file.exists():
-                with open(self.device_file, 'r', encoding='utf-8') as file:
-                    return json.load(file)
-            else:
-                # Se não existe, cria
+            device_data = self._load_device_file()
+            if device_data is None:
+                # Se não existe, cria (o conteúdo gravado fica em cache)
                 self.get_device_id()
-                with open(self.device_file, 'r', encoding='utf-8') as file:
-                    return json.load(file)
+                device_data = self._file_cache or self._load_device_file()
+            if device_data is None:
+                raise FileNotFoundError(f"Arquivo de dispositivo não encontrado: {self.device_file}")
+            return dict(device_data)
         except Exception as e:
             print(f"Erro ao obter informações do dispositivo: {e}")
             return {"error": str(e)}
@@ -166,17 +385,16 @@ class DeviceManager:
         Returns:
             bool: True se a integridade estiver ok, False caso contrário
         """
+        # Integridade já verificada nesta execução por get_device_id
+        if system_logger.is_cached('device_id_integrity'):
+            return system_logger.get_cached_verification('device_id_integrity')
+        
         try:
-            if not self.device_file.exists():
+            device_data = self._load_device_file()
+            if device_data is None:
                 return False
             
-            with open(self.device_file, 'r', encoding='utf-8') as file:
-                device_data = json.load(file)
-            
-            stored_id = device_data.get('device_id')
-            expected_id = self._generate_hardware_id()
-            
-            return stored_id == expected_id
+            return self._matches_current_hardware(device_data)
             
         except Exception as e:
             print(f"Erro ao verificar integridade: {e}")
@@ -24,13 +24,18 @@ os.environ['OPENCV_LOG_LEVEL'] = 'ERROR'     # Apenas erros críticos do OpenCV
 os.environ['OPENCV_VIDEOIO_DEBUG'] = '0'     # Desabilitar debug do VideoIO
 os.environ['FFMPEG_LOG_LEVEL'] = 'quiet'     # FFmpeg silencioso
 
+# RTSP de baixa latência no backend FFmpeg (CAP_PROP_BUFFERSIZE é ignorado por ele)
+os.environ.setdefault('OPENCV_FFMPEG_CAPTURE_OPTIONS', 'rtsp_transport;tcp|fflags;nobuffer|flags;low_delay|max_delay;0')
+
 import cv2
 import numpy as np
+import hashlib
+import re
+import uuid
 import threading
 import time
 import queue
 from datetime import datetime, timezone
-from collections import deque
 
 # Configurar OpenCV para suprimir logs
 cv2.setLogLevel(0)  # Suprimir logs do OpenCV
@@ -43,7 +48,7 @@ from qr_generator import QRCodeGenerator
 from onvif_device_info import ONVIFDeviceManager
 
 # Importação para gerenciamento do Supabase
-from supabase_manager import SupabaseManager
+from supabase_manager import SupabaseManager, validar_url_completa
 
 # Importação para gerenciamento de replays
 from replay_manager import ReplayManager
@@ -65,21 +70,269 @@ from network_checker import NetworkConnectivityChecker
 from offline_upload_manager import get_upload_manager
 
 
+# Pasta deste módulo (src) e raiz do projeto, resolvidas uma única vez
+_SRC_DIR = os.path.dirname(os.path.abspath(__file__))
+_PROJECT_ROOT = os.path.dirname(_SRC_DIR)
+# Pasta base padrão quando não há arena/quadra da sessão
+_DEFAULT_BASE_PATH = os.path.join(_PROJECT_ROOT, "arena_central_da_leste", "quadra_da_leeste")
+
+# Tamanho das janelas de visualização das câmeras
+DISPLAY_SIZE = (960, 540)
+
+# Validade das URLs assinadas dos vídeos enviados (7 dias)
+SIGNED_URL_EXPIRATION_SECONDS = 604800
+
+# Padrões do sanitizador de nomes de pasta (compilados uma única vez)
+_RE_CARACTERES_INVALIDOS = re.compile(r'[^\w\s\-_.]')
+_RE_SEPARADORES = re.compile(r'[\s_]+')  # Espaços e underscores viram um único '_'
+
+# Encoders H.264 por hardware em ordem de preferência (libx264 é o fallback em CPU)
+HW_H264_ENCODERS = ('h264_nvenc', 'h264_qsv', 'h264_amf', 'h264_vaapi')
+
+_h264_encoder = None
+_h264_encoder_lock = threading.Lock()
+
+_display_resize_backend = None
+
+# Mensagens de status das threads de captura são impressas por uma única thread,
+# para que a captura nunca bloqueie no stdout (o console do Windows é lento)
+_status_queue = queue.Queue()
+_status_thread = None
+_status_thread_lock = threading.Lock()
+
+
+def _status_printer():
+    """Imprime as mensagens de status enfileiradas pelas threads de captura"""
+    while True:
+        message = _status_queue.get()
+        try:
+            print(message)
+        finally:
+            _status_queue.task_done()
+
+
+def _start_status_printer():
+    """Inicia (uma única vez) a thread que imprime as mensagens de status"""
+    global _status_thread
+    
+    with _status_thread_lock:
+        if _status_thread is None:
+            _status_thread = threading.Thread(target=_status_printer, daemon=True)
+            _status_thread.start()
+
+
+def _flush_status_messages():
+    """Aguarda a impressão das mensagens de status pendentes (chamar após parar as capturas)"""
+    if _status_thread is not None:
+        _status_queue.join()
+
+
+def build_h264_args(encoder, crf, bitrate, width, height):
+    """
+    Monta os argumentos do FFmpeg para o encoder H.264 informado.
+    
+    Args:
+        encoder: Nome do encoder FFmpeg (h264_nvenc, h264_qsv, h264_amf, h264_vaapi ou libx264)
+        crf: Qualidade alvo (CRF/CQ)
+        bitrate: Bitrate máximo em kbps
+        width: Largura de saída
+        height: Altura de saída
+        
+    Returns:
+        tuple: (argumentos antes da entrada, argumentos de vídeo da saída)
+    """
+    rate_args = ['-maxrate', f'{bitrate}k', '-bufsize', f'{bitrate * 2}k']
+    
+    # Encoders que recebem frames em memória de sistema: forçar 4:2:0 (entrada BGR viraria 4:4:4)
+    pix_fmt_args = ['-pix_fmt', 'yuv420p']
+    
+    if encoder == 'h264_nvenc':
+        return [], pix_fmt_args + [
+            '-vf', f'scale={width}:{height}',
+            '-c:v', 'h264_nvenc', '-preset', 'p4', '-tune', 'hq',
+            '-rc', 'vbr', '-cq', str(crf), '-b:v', f'{bitrate}k'
+        ] + rate_args
+    
+    if encoder == 'h264_qsv':
+        return ['-init_hw_device', 'qsv=hw', '-filter_hw_device', 'hw'], [
+            '-vf', f'format=nv12,hwupload=extra_hw_frames=64,scale_qsv={width}:{height}',
+            '-c:v', 'h264_qsv', '-preset', 'fast', '-global_quality', str(crf)
+        ] + rate_args
+    
+    if encoder == 'h264_amf':
+        return [], pix_fmt_args + [
+            '-vf', f'scale={width}:{height}',
+            '-c:v', 'h264_amf', '-quality', 'speed',
+            '-rc', 'vbr_peak', '-b:v', f'{bitrate}k'
+        ] + rate_args
+    
+    if encoder == 'h264_vaapi':
+        return ['-vaapi_device', '/dev/dri/renderD128'], [
+            '-vf', f'format=nv12,hwupload,scale_vaapi=w={width}:h={height}',
+            '-c:v', 'h264_vaapi', '-rc_mode', 'VBR', '-b:v', f'{bitrate}k'
+        ] + rate_args
+    
+    return [], pix_fmt_args + [
+        '-vf', f'scale={width}:{height}',
+        '-c:v', 'libx264', '-preset', 'fast', '-crf', str(crf)
+    ] + rate_args
+
+
+def detect_h264_encoder():
+    """
+    Detecta (uma única vez) o melhor encoder H.264 disponível.
+    
+    Cada encoder de hardware listado pelo FFmpeg é testado com uma codificação
+    mínima, pois estar compilado não garante que a GPU/driver exista na máquina.
+    VIDEO_HW_ENCODER permite escolher: auto (padrão), none (força libx264) ou o
+    nome de um encoder específico (ex.: h264_nvenc).
+    
+    Returns:
+        str: Nome do encoder FFmpeg a usar ('libx264' se nenhum acelerador funcionar)
+    """
+    global _h264_encoder
+    
+    if _h264_encoder is not None:
+        return _h264_encoder
+    
+    with _h264_encoder_lock:
+        if _h264_encoder is not None:
+            return _h264_encoder
+        
+        import subprocess
+        
+        preference = os.getenv('VIDEO_HW_ENCODER', 'auto').strip().lower()
+        if preference in ('none', 'cpu', 'libx264'):
+            candidates = ()
+        elif preference == 'auto':
+            candidates = HW_H264_ENCODERS
+        else:
+            candidates = (preference,)
+        
+        encoder = 'libx264'
+        try:
+            result = subprocess.run(['ffmpeg', '-hide_banner', '-encoders'],
+                                    capture_output=True, text=True, timeout=10) if candidates else None
+            available = result.stdout if result and result.returncode == 0 else ''
+            
+            for candidate in candidates:
+                if candidate not in available:
+                    continue
+                
+                input_args, video_args = build_h264_args(candidate, 28, 1000, 320, 240)
+                cmd = (['ffmpeg', '-hide_banner', '-loglevel', 'error'] + input_args +
+                       ['-f', 'lavfi', '-i', 'color=c=black:s=320x240:d=0.2'] +
+                       video_args + ['-frames:v', '3', '-f', 'null', '-'])
+                try:
+                    test = subprocess.run(cmd, capture_output=True, text=True, timeout=15)
+                except subprocess.TimeoutExpired:
+                    continue
+                
+                if test.returncode == 0:
+                    encoder = candidate
+                    break
+        except (FileNotFoundError, subprocess.TimeoutExpired):
+            pass
+        
+        if encoder == 'libx264':
+            if candidates and preference != 'auto':
+                print(f"⚠️ Encoder {preference} indisponível - usando libx264")
+            print("🖥️ Encoder H.264: libx264 (CPU)")
+        else:
+            print(f"⚡ Encoder H.264 por hardware: {encoder}")
+        
+        _h264_encoder = encoder
+        return _h264_encoder
+
+
+def _uuid_deterministico(texto):
+    """UUID estável derivado do MD5 do texto (não criptográfico: aceito também em modo FIPS)"""
+    return str(uuid.UUID(hashlib.new('md5', texto.encode(), usedforsecurity=False).hexdigest()))
+
+
+def detect_display_resize_backend():
+    """
+    Detecta (uma única vez) onde redimensionar os frames de exibição.
+    
+    CUDA é usado se o OpenCV foi compilado com suporte e há GPU; senão OpenCL via
+    UMat (T-API), se disponível. DISPLAY_GPU_RESIZE permite escolher: auto (padrão),
+    none (força CPU), cuda ou opencl.
+    
+    Returns:
+        str: 'cuda', 'opencl' ou 'cpu'
+    """
+    global _display_resize_backend
+    
+    if _display_resize_backend is not None:
+        return _display_resize_backend
+    
+    preference = os.getenv('DISPLAY_GPU_RESIZE', 'auto').strip().lower()
+    
+    backend = 'cpu'
+    if preference in ('auto', 'cuda'):
+        try:
+            if cv2.cuda.getCudaEnabledDeviceCount() > 0:
+                backend = 'cuda'
+        except (AttributeError, cv2.error):
+            pass
+    if backend == 'cpu' and preference in ('auto', 'opencl'):
+        try:
+            if cv2.ocl.haveOpenCL():
+                cv2.ocl.setUseOpenCL(True)
+                if cv2.ocl.useOpenCL():
+                    backend = 'opencl'
+        except (AttributeError, cv2.error):
+            pass
+    
+    if backend == 'cpu':
+        if preference not in ('auto', 'none', 'cpu'):
+            print(f"⚠️ Redimensionamento {preference} indisponível - usando CPU")
+        print("🖥️ Redimensionamento da exibição: CPU")
+    else:
+        print(f"⚡ Redimensionamento da exibição na GPU: {backend}")
+    
+    _display_resize_backend = backend
+    return _display_resize_backend
+
+
 class CameraRecorder:
+    # Folga do ring buffer além da janela de 25s: enquanto um salvamento lê os
+    # frames mais antigos da janela, a captura continua gravando nesses slots extras
+    RING_HEADROOM_SECONDS = 5
+    
+    # Frames com marca d'água aguardando o encoder (limita a memória do salvamento)
+    WATERMARK_QUEUE_SIZE = 4
+    
+    # Frames por escrita no pipe do FFmpeg quando blocos contíguos do ring são enviados inteiros
+    PIPE_BLOCK_FRAMES = 32
+    
     def __init__(self, camera_url, camera_name, fps=30, buffer_seconds=25):
         self.camera_url = camera_url
         self.camera_name = camera_name
         self.fps = fps
         self.buffer_seconds = buffer_seconds
-        self.buffer_size = fps * buffer_seconds  # 25 segundos de frames
         
-        # Buffer circular para armazenar frames
-        self.frame_buffer = deque(maxlen=self.buffer_size)
-        self.timestamp_buffer = deque(maxlen=self.buffer_size)
-        
-        # Threading
+        # Configurações de codificação/upload (lidas uma vez do config.env)
+        self._load_encode_config()
+        
+        # Descartar frames já na captura: o buffer guarda só o que será salvo (FPS de upload)
+        self.capture_step = max(1, fps // self.upload_fps)
+        self.buffer_fps = fps // self.capture_step
+        self.buffer_size = self.buffer_fps * buffer_seconds  # 25 segundos de frames
+        
+        # Buffer circular pré-alocado (NumPy) para armazenar frames
+        # O array de frames é alocado no primeiro frame, quando a resolução é conhecida
+        self.ring_capacity = self.buffer_size + self.buffer_fps * self.RING_HEADROOM_SECONDS
+        self.ring = None
+        self.ts = np.empty(self.ring_capacity, dtype=np.float64)  # Só os slots da janela (count) são lidos
+        self.write_idx = 0       # Próximo slot a ser escrito
+        self.count = 0           # Frames válidos na janela (até buffer_size)
+        self.total_written = 0   # Total de frames escritos (índice absoluto)
+        self._decode_buffer = None  # Destino reutilizado da decodificação quando há redimensionamento
+        
+        # Threading (o evento interrompe imediatamente as esperas do loop de captura)
         self.capture_thread = None
-        self.running = False
+        self._stop_event = threading.Event()
         
         # Câmera
         self.cap = None
@@ -88,28 +341,74 @@ class CameraRecorder:
         
         # Lock para thread safety
         self.buffer_lock = threading.Lock()
-        self.saving = False  # Flag para pausar verificações durante salvamento
         
         # Sistema de marca d'água
         self.watermark_manager = None
         self._init_watermark_manager()
+    
+    def _load_encode_config(self):
+        """Lê do ambiente as configurações de compressão e marca d'água usadas nos salvamentos"""
+        self.compression_enabled = os.getenv('VIDEO_COMPRESSION_ENABLED', 'true').lower() == 'true'
+        self.crf = int(os.getenv('VIDEO_QUALITY_CRF', '28'))
+        self.bitrate_kbps = int(os.getenv('VIDEO_BITRATE_KBPS', '2000'))
+        self.upload_fps = int(os.getenv('VIDEO_FPS_UPLOAD', '15'))
+        if self.upload_fps < 1:
+            # 0 ou negativo quebraria a divisão do capture_step e o FPS do arquivo salvo
+            print(f"⚠️ [{self.camera_name}] VIDEO_FPS_UPLOAD={self.upload_fps} inválido - usando 1 FPS")
+            self.upload_fps = 1
+        self.scale_width = int(os.getenv('VIDEO_SCALE_WIDTH', '1280'))
+        self.scale_height = int(os.getenv('VIDEO_SCALE_HEIGHT', '720'))
+        self.max_file_size_mb = int(os.getenv('MAX_FILE_SIZE_MB', '50'))
+        self.watermark_enabled = os.getenv('WATERMARK_ENABLED', 'true').lower() == 'true'
+        
+    def _open_capture(self):
+        """
+        Abre o stream da câmera com o pipeline de baixa latência configurado
+        
+        LOW_LATENCY_PIPELINE=gst tenta um pipeline GStreamer cujo appsink descarta
+        frames atrasados; se falhar (ou com ffmpeg, o padrão) usa o backend FFmpeg
+        com as opções de OPENCV_FFMPEG_CAPTURE_OPTIONS.
         
+        Returns:
+            cv2.VideoCapture: Captura aberta (verificar isOpened)
+        """
+        pipeline = os.getenv('LOW_LATENCY_PIPELINE', 'ffmpeg').lower()
+        
+        if pipeline == 'gst' and self.camera_url.startswith('rtsp://'):
+            gst_pipeline = (
+                f"rtspsrc location={self.camera_url} latency=100 ! rtph264depay ! h264parse ! "
+                "avdec_h264 ! videoconvert ! video/x-raw,format=BGR ! "
+                "appsink max-buffers=1 drop=true sync=false"
+            )
+            cap = cv2.VideoCapture(gst_pipeline, cv2.CAP_GSTREAMER)
+            if cap.isOpened():
+                print(f"⚡ {self.camera_name}: pipeline GStreamer de baixa latência")
+                return cap
+            
+            cap.release()
+            print(f"⚠️ {self.camera_name}: GStreamer indisponível - usando FFmpeg")
+        
+        cap = cv2.VideoCapture(self.camera_url)
+        
+        if cap.isOpened():
+            # Configurar propriedades da câmera para reduzir latência
+            cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)  # Buffer mínimo
+            cap.set(cv2.CAP_PROP_FPS, 30)  # Forçar 30 FPS
+            
+            # Configurações adicionais para RTSP
+            cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc('M', 'J', 'P', 'G'))
+        
+        return cap
+    
     def connect_camera(self):
         """Conecta à câmera IP"""
         print(f"Conectando à câmera {self.camera_name}: {self.camera_url}")
         
-        self.cap = cv2.VideoCapture(self.camera_url)
+        self.cap = self._open_capture()
         
         if not self.cap.isOpened():
             print(f"Erro: Não foi possível conectar à câmera {self.camera_name}")
             return False
-            
-        # Configurar propriedades da câmera para reduzir latência
-        self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)  # Buffer mínimo
-        self.cap.set(cv2.CAP_PROP_FPS, 30)  # Forçar 30 FPS
-        
-        # Configurações adicionais para RTSP
-        self.cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc('M', 'J', 'P', 'G'))
         
         # Obter resolução da câmera
         self.frame_width = int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH))
@@ -127,19 +426,20 @@ class CameraRecorder:
         if not self.connect_camera():
             return False
             
-        self.running = True
+        _start_status_printer()
+        self._stop_event.clear()
         self.capture_thread = threading.Thread(target=self._capture_loop)
         self.capture_thread.daemon = True
         self.capture_thread.start()
         
         print(f"✅ Captura iniciada para {self.camera_name}")
-        print(f"   Buffer configurado para: {self.buffer_seconds}s ({self.buffer_size} frames)")
+        print(f"   Buffer configurado para: {self.buffer_seconds}s ({self.buffer_size} frames a {self.buffer_fps} FPS)")
         
         return True
     
     def stop_capture(self):
         """Para a captura"""
-        self.running = False
+        self._stop_event.set()
         if self.capture_thread:
             self.capture_thread.join()
         if self.cap:
@@ -148,82 +448,89 @@ class CameraRecorder:
     def _capture_loop(self):
         """Loop principal de captura de frames"""
         consecutive_errors = 0
-        last_health_check = time.time()
-        last_buffer_report = time.time()
+        last_health_check = last_buffer_report = time.monotonic()
         buffer_fill_reported = False  # Para reportar quando o buffer estiver cheio pela primeira vez
-        
-        while self.running:
-            ret, frame = self.cap.read()
+        frame_counter = 0  # Relatórios só são avaliados a cada ~5s de frames guardados
+        report_interval = self.buffer_fps * 5
+        capture_index = 0
+        
+        while not self._stop_event.is_set():
+            if capture_index % self.capture_step:
+                # Frame descartado: apenas avança o stream, sem converter para BGR
+                ret = self.cap.grab()
+                frame = None
+            else:
+                ret, frame, in_place = self._read_frame()
+            capture_index += 1
             
             if ret:
                 consecutive_errors = 0
-                current_time = time.time()
+                if frame is None:
+                    continue
+                current_time = time.monotonic()  # Relógio monotônico: imune a ajustes do relógio do sistema
                 
                 with self.buffer_lock:
-                    self.frame_buffer.append(frame)
-                    self.timestamp_buffer.append(current_time)
-                    
-                    # Manter apenas os frames do buffer configurado
-                    while len(self.frame_buffer) > self.buffer_size:
-                        self.frame_buffer.popleft()
-                        self.timestamp_buffer.popleft()
-                    
-                    # Reportar quando o buffer estiver cheio pela primeira vez
-                    if not buffer_fill_reported and len(self.frame_buffer) >= self.buffer_size * 0.95:
-                        buffer_duration = self.timestamp_buffer[-1] - self.timestamp_buffer[0] if len(self.timestamp_buffer) > 1 else 0
-                        print(f"🎯 {self.camera_name}: Buffer inicial preenchido - {len(self.frame_buffer)}/{self.buffer_size} frames ({buffer_duration:.1f}s)")
-                        buffer_fill_reported = True
+                    self._append_frame(frame, current_time, in_place=in_place)
+                    buffer_count = self.count
                 
-                # Relatório de status do buffer a cada 30 segundos
-                if current_time - last_buffer_report > 30:
+                # Reportar quando o buffer estiver cheio pela primeira vez (print fora do lock)
+                if not buffer_fill_reported and buffer_count >= self.buffer_size * 0.95:
                     with self.buffer_lock:
-                        buffer_count = len(self.frame_buffer)
-                        if len(self.timestamp_buffer) > 1:
-                            buffer_duration = self.timestamp_buffer[-1] - self.timestamp_buffer[0]
-                            print(f"📊 {self.camera_name}: Buffer atual {buffer_count}/{self.buffer_size} frames ({buffer_duration:.1f}s)")
-                        else:
-                            print(f"📊 {self.camera_name}: Buffer atual {buffer_count}/{self.buffer_size} frames")
-                    last_buffer_report = current_time
+                        buffer_count = self.count
+                        buffer_duration = self._buffer_duration()
+                    _status_queue.put_nowait(f"🎯 {self.camera_name}: Buffer inicial preenchido - {buffer_count}/{self.buffer_size} frames ({buffer_duration:.1f}s)")
+                    buffer_fill_reported = True
                 
-                # Verificação de saúde do buffer (apenas se não estiver salvando)
-                if not self.saving and current_time - last_health_check > 10:
-                    self._check_buffer_health()
-                    last_health_check = current_time
+                frame_counter += 1
+                if frame_counter % report_interval == 0:
+                    # Relatório de status do buffer a cada 30 segundos
+                    if current_time - last_buffer_report > 30:
+                        with self.buffer_lock:
+                            buffer_count = self.count
+                            buffer_duration = self._buffer_duration()
+                        if buffer_count > 1:
+                            _status_queue.put_nowait(f"📊 {self.camera_name}: Buffer atual {buffer_count}/{self.buffer_size} frames ({buffer_duration:.1f}s)")
+                        else:
+                            _status_queue.put_nowait(f"📊 {self.camera_name}: Buffer atual {buffer_count}/{self.buffer_size} frames")
+                        last_buffer_report = current_time
+                    
+                    # Verificação de saúde do buffer
+                    if current_time - last_health_check > 10:
+                        self._check_buffer_health()
+                        last_health_check = current_time
                     
             else:
                 consecutive_errors += 1
-                print(f"⚠️  Erro na captura {self.camera_name} (erro #{consecutive_errors})")
+                _status_queue.put_nowait(f"⚠️  Erro na captura {self.camera_name} (erro #{consecutive_errors})")
                 
                 # Tentar reconectar após muitos erros
                 if consecutive_errors >= 30:
-                    print(f"🔄 Tentando reconectar {self.camera_name} após {consecutive_errors} erros...")
+                    _status_queue.put_nowait(f"🔄 Tentando reconectar {self.camera_name} após {consecutive_errors} erros...")
                     if self._reconnect_camera():
                         consecutive_errors = 0
                         buffer_fill_reported = False  # Reset para reportar novamente após reconexão
-                    else:
-                        time.sleep(1)  # Esperar mais tempo se a reconexão falhar
+                    elif self._stop_event.wait(1):  # Esperar mais tempo se a reconexão falhar
+                        break
                 
-                time.sleep(0.033)  # ~30 FPS em caso de erro
+                if self._stop_event.wait(0.033):  # ~30 FPS em caso de erro
+                    break
     
     def _check_buffer_health(self):
         """Verifica a saúde do buffer e reporta problemas"""
-        # Não verificar durante salvamento para evitar interferência
-        if self.saving:
-            return
-            
         with self.buffer_lock:
-            if len(self.timestamp_buffer) < 2:
-                return
-                
-            buffer_duration = self.timestamp_buffer[-1] - self.timestamp_buffer[0]
-            expected_frames = self.buffer_seconds * self.fps
-            current_frames = len(self.frame_buffer)
-            
-            # Verificar se o buffer está muito abaixo do esperado
-            if current_frames < expected_frames * 0.8:  # 80% do esperado
-                print(f"⚠️  Câmera {self.camera_name}: Buffer baixo - {current_frames}/{expected_frames} frames ({buffer_duration:.1f}s)")
-            elif current_frames >= expected_frames * 0.95:  # Buffer quase cheio
-                print(f"✅ Câmera {self.camera_name}: Buffer saudável - {current_frames}/{expected_frames} frames ({buffer_duration:.1f}s)")
+            current_frames = self.count
+            buffer_duration = self._buffer_duration()
+        
+        if current_frames < 2:
+            return
+        
+        expected_frames = self.buffer_size
+        
+        # Verificar se o buffer está muito abaixo do esperado
+        if current_frames < expected_frames * 0.8:  # 80% do esperado
+            _status_queue.put_nowait(f"⚠️  Câmera {self.camera_name}: Buffer baixo - {current_frames}/{expected_frames} frames ({buffer_duration:.1f}s)")
+        elif current_frames >= expected_frames * 0.95:  # Buffer quase cheio
+            _status_queue.put_nowait(f"✅ Câmera {self.camera_name}: Buffer saudável - {current_frames}/{expected_frames} frames ({buffer_duration:.1f}s)")
     
     def _reconnect_camera(self):
         """Tenta reconectar a câmera"""
@@ -231,35 +538,152 @@ class CameraRecorder:
             if self.cap:
                 self.cap.release()
             
-            print(f"Reconectando câmera {self.camera_name}...")
-            self.cap = cv2.VideoCapture(self.camera_url)
+            _status_queue.put_nowait(f"Reconectando câmera {self.camera_name}...")
+            self.cap = self._open_capture()
             
             if self.cap.isOpened():
-                # Reconfigurar propriedades
-                self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
-                self.cap.set(cv2.CAP_PROP_FPS, 30)
-                self.cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc('M', 'J', 'P', 'G'))
-                print(f"✅ Câmera {self.camera_name} reconectada com sucesso")
+                _status_queue.put_nowait(f"✅ Câmera {self.camera_name} reconectada com sucesso")
+                return True
             else:
-                print(f"❌ Falha ao reconectar câmera {self.camera_name}")
+                _status_queue.put_nowait(f"❌ Falha ao reconectar câmera {self.camera_name}")
+                return False
                 
         except Exception as e:
-            print(f"❌ Erro na reconexão da câmera {self.camera_name}: {e}")
+            _status_queue.put_nowait(f"❌ Erro na reconexão da câmera {self.camera_name}: {e}")
+            return False
 
-    def get_latest_frame(self):
-        """Retorna o frame mais recente do buffer"""
+    def _next_slot(self):
+        """Slot de destino para o próximo frame decodificado (None antes da alocação)"""
+        if self.ring is None:
+            return None
+        return self.ring[self.write_idx]
+    
+    def _read_frame(self):
+        """
+        Lê o próximo frame já no formato guardado no ring buffer
+        
+        Com compressão habilitada, frames maiores que VIDEO_SCALE_WIDTH x VIDEO_SCALE_HEIGHT
+        são reduzidos (INTER_AREA) direto no slot, e o FFmpeg recebe o tamanho final.
+        Sem redimensionamento, o frame é decodificado direto no slot.
+        
+        Returns:
+            tuple: (ret, frame, True se o frame já está no slot do ring buffer)
+        """
+        slot = self._next_slot()
+        
+        # O OpenCV só realoca (retorna outro array) se a resolução mudar
+        ret, frame = self.cap.read(slot if self._decode_buffer is None else self._decode_buffer)
+        if not ret:
+            return False, None, False
+        
+        frame_height, frame_width = frame.shape[:2]
+        if self.compression_enabled and (frame_width > self.scale_width or frame_height > self.scale_height):
+            # Frame decodificado vira o destino da próxima leitura
+            self._decode_buffer = frame
+            frame = cv2.resize(frame, (self.scale_width, self.scale_height), dst=slot, interpolation=cv2.INTER_AREA)
+        else:
+            self._decode_buffer = None
+        
+        return True, frame, slot is not None and frame is slot
+    
+    def _append_frame(self, frame, timestamp, in_place=False):
+        """
+        Registra um frame no próximo slot do ring buffer (chamar com buffer_lock).
+        
+        Args:
+            frame: Frame capturado
+            timestamp: Momento da captura
+            in_place: True se o frame já foi decodificado diretamente no slot
+        """
+        if self.ring is None or self.ring.shape[1:] != frame.shape:
+            # Primeiro frame ou resolução mudou (reconexão): (re)alocar e esvaziar a janela
+            self.ring = np.empty((self.ring_capacity,) + frame.shape, dtype=frame.dtype)
+            self.count = 0
+            in_place = False
+        
+        slot = self.write_idx
+        if not in_place:
+            self.ring[slot] = frame
+        self.ts[slot] = timestamp
+        self.write_idx = (slot + 1) % self.ring_capacity
+        self.total_written += 1
+        if self.count < self.buffer_size:
+            self.count += 1
+    
+    def _buffer_duration(self):
+        """Duração (s) da janela atual do buffer (chamar com buffer_lock)"""
+        if self.count < 2:
+            return 0
+        newest = (self.write_idx - 1) % self.ring_capacity
+        oldest = (self.write_idx - self.count) % self.ring_capacity
+        return self.ts[newest] - self.ts[oldest]
+    
+    def _snapshot_window(self):
+        """
+        Captura apenas os índices da janela atual do buffer (sem copiar frames).
+        
+        Returns:
+            tuple: (ring, índice absoluto do primeiro frame, quantidade de frames, timestamps)
+        """
         with self.buffer_lock:
-            if len(self.frame_buffer) > 0:
-                return self.frame_buffer[-1]
-        return None
+            end = self.total_written
+            count = self.count
+            ring = self.ring
+            
+            # No máximo duas fatias contíguas do array de timestamps (antes/depois da volta)
+            start_slot = (end - count) % self.ring_capacity
+            end_slot = start_slot + count
+            if end_slot <= self.ring_capacity:
+                timestamps = self.ts[start_slot:end_slot].copy()
+            else:
+                timestamps = np.concatenate((self.ts[start_slot:], self.ts[:end_slot - self.ring_capacity]))
+        return ring, end - count, count, timestamps
+    
+    def _frame_at(self, ring, abs_index):
+        """Retorna (view) o frame de índice absoluto abs_index no ring buffer"""
+        return ring[abs_index % self.ring_capacity]
+    
+    def _iter_ring_blocks(self, ring, first_index, frame_count):
+        """
+        Itera (índice, bloco) com fatias contíguas do ring buffer (views, sem cópia).
+        
+        Cada bloco tem até PIPE_BLOCK_FRAMES frames e nunca atravessa o fim do ring;
+        o índice é o do primeiro (mais antigo) frame do bloco.
+        """
+        i = 0
+        while i < frame_count:
+            slot = (first_index + i) % self.ring_capacity
+            n = min(self.PIPE_BLOCK_FRAMES, frame_count - i, self.ring_capacity - slot)
+            yield i, ring[slot:slot + n]
+            i += n
+    
+    def _frame_overwritten(self, abs_index):
+        """True se o slot do frame abs_index já foi (ou está sendo) reescrito pela captura"""
+        return self.total_written - abs_index >= self.ring_capacity
+    
+    def get_latest_frame_view(self):
+        """
+        Retorna (view, sem cópia e sem lock) o frame mais recente do buffer
+        
+        write_idx só avança depois que o slot foi escrito, então o slot anterior está
+        completo; no pior caso a leitura vê o frame anterior. A view deve ser usada
+        apenas para leitura imediata (ex.: exibição), pois o slot será reutilizado.
+        """
+        ring = self.ring
+        if ring is None or self.count == 0:
+            return None
+        return ring[(self.write_idx - 1) % self.ring_capacity]
+    
+    def get_latest_frame(self):
+        """Retorna uma cópia do frame mais recente do buffer"""
+        frame = self.get_latest_frame_view()
+        return frame.copy() if frame is not None else None
     
     def _init_watermark_manager(self):
         """Inicializa o sistema de marca d'água"""
         try:
             # Verificar se a marca d'água está habilitada
-            watermark_enabled = os.getenv('WATERMARK_ENABLED', 'true').lower() == 'true'
-            
-            if watermark_enabled:
+            if self.watermark_enabled:
                 watermark_path = os.getenv('WATERMARK_PATH', 
                     r"c:\Users\Vinicius\PycharmProjects\Projeto Camera Vai dar Certo\marca_dagua\Smart Byte - Horizontal.png")
                 
@@ -278,34 +702,30 @@ class CameraRecorder:
             import subprocess
             
             # Configurações de compressão do config.env
-            compression_enabled = os.getenv('VIDEO_COMPRESSION_ENABLED', 'true').lower() == 'true'
-            if not compression_enabled:
+            if not self.compression_enabled:
                 print(f"📁 [{self.camera_name}] Compressão desabilitada - usando arquivo original")
                 return input_path
             
-            crf = int(os.getenv('VIDEO_QUALITY_CRF', '28'))
-            bitrate = int(os.getenv('VIDEO_BITRATE_KBPS', '2000'))
-            fps = int(os.getenv('VIDEO_FPS_UPLOAD', '15'))
-            width = int(os.getenv('VIDEO_SCALE_WIDTH', '1280'))
-            height = int(os.getenv('VIDEO_SCALE_HEIGHT', '720'))
-            max_size_mb = int(os.getenv('MAX_FILE_SIZE_MB', '50'))
+            crf = self.crf
+            bitrate = self.bitrate_kbps
+            fps = self.upload_fps
+            width = self.scale_width
+            height = self.scale_height
+            max_size_mb = self.max_file_size_mb
             
-            print(f"🗜️ [{self.camera_name}] Comprimindo para upload...")
+            encoder = detect_h264_encoder()
+            input_args, video_args = build_h264_args(encoder, crf, bitrate, width, height)
+            
+            print(f"🗜️ [{self.camera_name}] Comprimindo para upload ({encoder})...")
             print(f"   📐 Resolução: {width}x{height}")
             print(f"   🎬 FPS: {fps}")
             print(f"   📊 CRF: {crf}, Bitrate: {bitrate}k")
             print(f"   📦 Tamanho máximo: {max_size_mb}MB")
             
             # Comando FFmpeg otimizado
-            cmd = [
-                'ffmpeg', '-y',  # Sobrescrever arquivo se existir
+            cmd = ['ffmpeg', '-y'] + input_args + [  # Sobrescrever arquivo se existir
                 '-i', input_path,  # Arquivo de entrada
-                '-c:v', 'libx264',  # Codec de vídeo
-                '-preset', 'fast',  # Preset de velocidade
-                '-crf', str(crf),  # Qualidade (18-28 é bom)
-                '-maxrate', f'{bitrate}k',  # Bitrate máximo
-                '-bufsize', f'{bitrate * 2}k',  # Buffer size
-                '-vf', f'scale={width}:{height}',  # Redimensionar
+            ] + video_args + [  # Encoder, qualidade, bitrate e escala
                 '-r', str(fps),  # FPS
                 '-movflags', '+faststart',  # Otimizar para streaming
                 '-loglevel', 'error',  # Apenas erros
@@ -361,15 +781,12 @@ class CameraRecorder:
             # Configurações mais agressivas
             aggressive_output = output_path.replace('.mp4', '_aggressive.mp4')
             
-            cmd = [
-                'ffmpeg', '-y',
+            # Mesmo encoder, com qualidade, bitrate e resolução menores
+            input_args, video_args = build_h264_args(detect_h264_encoder(), 32, 1000, 960, 540)
+            
+            cmd = ['ffmpeg', '-y'] + input_args + [
                 '-i', input_path,
-                '-c:v', 'libx264',
-                '-preset', 'fast',
-                '-crf', '32',  # Qualidade mais baixa
-                '-maxrate', '1000k',  # Bitrate menor
-                '-bufsize', '2000k',
-                '-vf', 'scale=960:540',  # Resolução menor
+            ] + video_args + [
                 '-r', '12',  # FPS menor
                 '-movflags', '+faststart',
                 '-loglevel', 'error',
@@ -383,172 +800,338 @@ class CameraRecorder:
                 print(f"   📊 Compressão agressiva: {aggressive_size:.1f}MB")
                 
                 if aggressive_size <= max_size_mb:
-                    # Remover arquivo intermediário
-                    if os.path.exists(output_path):
-                        os.remove(output_path)
-                    os.rename(aggressive_output, output_path)
+                    # Substituir o arquivo final em uma única operação (também no Windows)
+                    os.replace(aggressive_output, output_path)
                     print(f"   ✅ Tamanho aceitável após compressão agressiva")
                     return output_path
                 else:
                     print(f"   ❌ Ainda muito grande mesmo com compressão agressiva")
+                    os.remove(aggressive_output)
                     return None
             else:
                 print(f"   ❌ Falha na compressão agressiva")
+                if os.path.exists(aggressive_output):
+                    os.remove(aggressive_output)
                 return None
                 
         except Exception as e:
             print(f"❌ [{self.camera_name}] Erro na compressão agressiva: {e}")
             return None
 
-    def save_last_25_seconds(self, output_path):
-        """Salva os últimos 25 segundos diretamente em formato otimizado"""
-        print(f"🎬 [{self.camera_name}] Iniciando salvamento otimizado...")
+    def _open_ffmpeg_pipe(self, output_path, width, height, fps):
+        """
+        Abre um processo FFmpeg que recebe frames BGR crus pelo stdin e grava H.264 em output_path
+        
+        Returns:
+            subprocess.Popen: Processo do FFmpeg, ou None se o FFmpeg não estiver disponível
+        """
+        import subprocess
+        
+        crf = self.crf
+        bitrate = self.bitrate_kbps
+        scale_width = self.scale_width
+        scale_height = self.scale_height
+        
+        encoder = detect_h264_encoder()
+        input_args, video_args = build_h264_args(encoder, crf, bitrate, scale_width, scale_height)
+        
+        cmd = ['ffmpeg', '-y', '-loglevel', 'error'] + input_args + [
+            '-f', 'rawvideo',  # Frames crus vindos do buffer
+            '-pix_fmt', 'bgr24',
+            '-s', f'{width}x{height}',
+            '-r', str(fps),
+            '-i', 'pipe:0',
+        ] + video_args + [
+            '-movflags', '+faststart',  # Otimizar para streaming
+            output_path
+        ]
         
-        # Marcar que está salvando para pausar verificações
-        self.saving = True
-        print(f"🔒 [{self.camera_name}] Flag saving ativada")
+        print(f"🎥 [{self.camera_name}] FFmpeg ({encoder}): {width}x{height} → {scale_width}x{scale_height}, CRF {crf}, {bitrate}k")
         
         try:
-            print(f"🔄 [{self.camera_name}] Copiando buffer com lock...")
-            with self.buffer_lock:
-                if len(self.frame_buffer) == 0:
-                    print(f"❌ [{self.camera_name}] Buffer vazio")
-                    return False
-                    
-                frames = list(self.frame_buffer)
-                timestamps = list(self.timestamp_buffer)
-                print(f"📊 [{self.camera_name}] Buffer copiado: {len(frames)} frames, {len(timestamps)} timestamps")
-            
-            # Verificar se há frames suficientes
-            min_frames = self.fps * 5  # Pelo menos 5 segundos
-            if len(frames) < min_frames:
-                print(f"❌ [{self.camera_name}] Buffer insuficiente: {len(frames)} frames (mínimo: {min_frames})")
-                return False
-            
-            # Calcular tempo real do buffer
-            if len(timestamps) > 1:
-                buffer_duration = timestamps[-1] - timestamps[0]
-                real_fps = len(frames) / buffer_duration if buffer_duration > 0 else 0
-                
-                # Alertar se o buffer está muito abaixo do esperado
-                expected_duration = self.buffer_seconds
-                if buffer_duration < expected_duration * 0.8:  # 80% do esperado
-                    print(f"⚠️  [{self.camera_name}] Buffer curto - {buffer_duration:.1f}s de {expected_duration}s esperados")
-                
-                print(f"📊 [{self.camera_name}] {len(frames)} frames, {buffer_duration:.1f}s, FPS real: {real_fps:.1f}")
-            
-            # Criar pasta se não existir
-            print(f"📁 [{self.camera_name}] Criando diretório: {os.path.dirname(output_path)}")
-            os.makedirs(os.path.dirname(output_path), exist_ok=True)
-            
-            # Configurar codec otimizado H.264
-            print(f"🎥 [{self.camera_name}] Configurando VideoWriter otimizado...")
+            return subprocess.Popen(cmd, stdin=subprocess.PIPE, stderr=subprocess.PIPE)
+        except FileNotFoundError:
+            print(f"⚠️ [{self.camera_name}] FFmpeg não encontrado - usando VideoWriter")
+            return None
+    
+    def _finish_ffmpeg_pipe(self, proc):
+        """Fecha o stdin do FFmpeg e aguarda o fim da codificação"""
+        import subprocess
+        
+        try:
+            _, stderr = proc.communicate(timeout=300)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            proc.communicate()
+            print(f"⏰ [{self.camera_name}] Timeout na codificação FFmpeg (5min)")
+            return False
+        
+        if proc.returncode != 0:
+            print(f"❌ [{self.camera_name}] Erro na codificação FFmpeg:")
+            print(f"   {stderr.decode(errors='replace')}")
+            return False
+        
+        return True
+
+    def _iter_save_frames(self, ring, first_index, frame_indices):
+        """
+        Itera (índice, frame) dos frames a salvar, já com marca d'água se habilitada.
+        
+        Com marca d'água, uma thread produtora aplica o blending em um pool de buffers
+        reutilizáveis enquanto o consumidor envia os frames ao encoder. O buffer de um
+        frame volta ao pool quando o próximo frame é pedido.
+        """
+        if not self.watermark_manager:
+            for i in frame_indices:
+                yield i, self._frame_at(ring, first_index + i)
+            return
+        
+        # Pool: fila cheia + 1 frame em blending + 1 frame em escrita
+        free_buffers = queue.Queue()
+        for _ in range(self.WATERMARK_QUEUE_SIZE + 2):
+            free_buffers.put(np.empty_like(ring[0]))
+        blended_frames = queue.Queue(maxsize=self.WATERMARK_QUEUE_SIZE)
+        stop_blending = threading.Event()
+        
+        def blend_frames():
+            try:
+                for i in frame_indices:
+                    buffer = free_buffers.get()
+                    if stop_blending.is_set():
+                        break
+                    frame = self.watermark_manager.apply_watermark(self._frame_at(ring, first_index + i), out=buffer)
+                    blended_frames.put((i, frame, buffer))
+            except Exception as e:
+                print(f"❌ [{self.camera_name}] Erro ao aplicar marca d'água: {e}")
+            finally:
+                blended_frames.put(None)
+        
+        producer = threading.Thread(target=blend_frames, daemon=True)
+        producer.start()
+        
+        try:
+            for i, frame, buffer in iter(blended_frames.get, None):
+                yield i, frame
+                free_buffers.put(buffer)
+        finally:
+            stop_blending.set()
+            # Liberar o produtor caso esteja bloqueado na fila ou esperando um buffer livre
+            while producer.is_alive():
+                try:
+                    item = blended_frames.get(timeout=0.1)
+                except queue.Empty:
+                    continue
+                if item is not None:
+                    free_buffers.put(item[2])
+            producer.join()
+
+    def _write_window(self, ring, first_index, frame_count, output_path):
+        """
+        Codifica uma janela do ring buffer diretamente em output_path.
+        
+        Com compressão habilitada os frames crus vão para o FFmpeg (uma única codificação,
+        H.264 por hardware quando disponível); sem compressão ou sem FFmpeg, usa VideoWriter MP4V.
+        
+        Returns:
+            int: Tamanho do arquivo final em bytes, ou None se o salvamento falhou
+        """
+        # Usar FPS reduzido para arquivo menor
+        optimized_fps = self.upload_fps
+        frame_height, frame_width = ring.shape[1:3]
+        print(f"📐 [{self.camera_name}] Resolução: {frame_width}x{frame_height}")
+        
+        # Com compressão: frames crus direto para o FFmpeg (uma única codificação, sem arquivo temporário)
+        proc = self._open_ffmpeg_pipe(output_path, frame_width, frame_height, optimized_fps) if self.compression_enabled else None
+        
+        if proc is not None:
+            # Escrita zero-copy: o buffer do ndarray vai direto para o pipe
+            def write_frame(frame):
+                proc.stdin.write(memoryview(frame).cast('B'))
+        else:
+            # Sem compressão (ou sem FFmpeg): VideoWriter MP4V direto no arquivo final
             fourcc = cv2.VideoWriter_fourcc(*'mp4v')  # Usar mp4v em vez de H264 para compatibilidade
-            print(f"📐 [{self.camera_name}] Resolução: {self.frame_width}x{self.frame_height}")
-            
-            # Usar FPS reduzido para arquivo menor
-            optimized_fps = int(os.getenv('VIDEO_FPS_UPLOAD', '15'))
-            
-            # Criar arquivo temporário primeiro
-            temp_output = output_path.replace('.mp4', '_temp.mp4')
-            out = cv2.VideoWriter(temp_output, fourcc, optimized_fps, 
-                                 (self.frame_width, self.frame_height))
+            out = cv2.VideoWriter(output_path, fourcc, optimized_fps, (frame_width, frame_height))
             
             if not out.isOpened():
                 print(f"❌ [{self.camera_name}] Erro ao criar VideoWriter")
-                return False
-            
-            print(f"✅ [{self.camera_name}] VideoWriter otimizado configurado (MP4V, {optimized_fps} FPS)")
-            
-            # Calcular step para manter FPS desejado
-            frame_step = max(1, int(self.fps / optimized_fps))
-            print(f"💾 [{self.camera_name}] Salvando frames otimizados (step: {frame_step})...")
-            
-            frames_written = 0
-            start_time = time.time()
+                return None
             
-            for i in range(0, len(frames), frame_step):
+            print(f"✅ [{self.camera_name}] VideoWriter configurado (MP4V, {optimized_fps} FPS)")
+            write_frame = out.write
+        
+        # Calcular step para manter FPS desejado
+        frame_step = max(1, int(self.buffer_fps / optimized_fps))
+        print(f"💾 [{self.camera_name}] Salvando frames otimizados (step: {frame_step})...")
+        
+        frames_written = 0
+        write_errors = 0
+        last_error = None
+        overwritten = False
+        pipe_broken = False
+        start_time = time.time()
+        # Progresso por frame só em modo verbose; o resumo é impresso após o loop
+        report_progress = system_logger.is_debug_enabled()
+        
+        # Índices dos frames selecionados calculados uma única vez
+        selected_indices = range(0, frame_count, frame_step)
+        
+        if proc is not None and frame_step == 1 and not self.watermark_manager:
+            # Sem marca d'água nem descarte: blocos contíguos do ring vão inteiros para o pipe
+            save_frames = self._iter_ring_blocks(ring, first_index, frame_count)
+        else:
+            # A marca d'água do próximo frame é aplicada em paralelo à escrita do atual
+            save_frames = self._iter_save_frames(ring, first_index, selected_indices)
+        next_check = 0
+        try:
+            for i, frame in save_frames:
                 try:
-                    frame = frames[i]
-                    if frame is not None:
-                        # Verificar timeout (máximo 2 minutos)
+                    # Verificar timeout (máximo 2 minutos) a cada 256 frames
+                    if frames_written >= next_check:
+                        next_check += 256
                         elapsed = time.time() - start_time
                         if elapsed > 120:  # 2 minutos
                             print(f"⏰ [{self.camera_name}] Timeout após {elapsed:.1f}s - salvando {frames_written} frames")
                             break
                         
-                        # Aplicar marca d'água se habilitada
-                        if self.watermark_manager:
-                            frame = self.watermark_manager.apply_watermark(frame)
-                        
-                        out.write(frame)
-                        frames_written += 1
-                        
-                        # Progress report a cada 50 frames salvos
-                        if frames_written % 50 == 0:
-                            progress = (i / len(frames)) * 100
-                            elapsed = time.time() - start_time
+                        if report_progress:
+                            progress = frames_written * 100 / len(selected_indices)
                             fps_write = frames_written / elapsed if elapsed > 0 else 0
-                            watermark_status = "com marca d'água" if self.watermark_manager else "sem marca d'água"
-                            print(f"📈 [{self.camera_name}] Progresso: {frames_written} frames salvos ({progress:.1f}%) - {fps_write:.1f} fps escrita ({watermark_status})")
-                    else:
-                        print(f"⚠️  [{self.camera_name}] Frame {i} é None")
-                        
+                            log_debug("📈 [%s] Progresso: %d frames salvos (%.1f%%) - %.1f fps escrita",
+                                      self.camera_name, frames_written, progress, fps_write)
+                    
+                    if not frame.flags.c_contiguous:
+                        frame = np.ascontiguousarray(frame)
+                    
+                    write_frame(frame)
+                    frames_written += 1 if frame.ndim == 3 else len(frame)
+                    
+                    # A captura alcançou o slot (do frame mais antigo) durante a leitura: frame possivelmente corrompido
+                    if self._frame_overwritten(first_index + i):
+                        overwritten = True
+                        break
+                
+                except OSError as e:
+                    if proc is not None:
+                        # FFmpeg encerrou antes do fim (BrokenPipeError; no Windows, OSError EINVAL);
+                        # o erro é reportado ao finalizar
+                        pipe_broken = True
+                        break
+                    write_errors += 1
+                    last_error = e
                 except Exception as e:
-                    print(f"❌ [{self.camera_name}] Erro ao escrever frame {i}: {e}")
+                    write_errors += 1
+                    last_error = e
                     continue
+        finally:
+            save_frames.close()
+        
+        total_time = time.time() - start_time
+        fps_write = frames_written / total_time if total_time > 0 else 0
+        watermark_status = "com marca d'água" if self.watermark_manager else "sem marca d'água"
+        print(f"🔚 [{self.camera_name}] {frames_written} frames escritos em {total_time:.1f}s ({fps_write:.1f} fps, {watermark_status})")
+        if write_errors:
+            print(f"❌ [{self.camera_name}] {write_errors} frames com erro de escrita (último: {last_error})")
+        
+        if proc is not None:
+            encoded = self._finish_ffmpeg_pipe(proc) and not pipe_broken
+        else:
+            out.release()
+            encoded = True
+        
+        if overwritten:
+            print(f"❌ [{self.camera_name}] Buffer sobrescrito pela captura durante o salvamento")
+        
+        if overwritten or not encoded:
+            if os.path.exists(output_path):
+                os.remove(output_path)
+            print(f"❌ [{self.camera_name}] Arquivo não foi criado")
+            return None
+        
+        # Um único stat: o tamanho é repassado a quem chamou (upload e verificação)
+        try:
+            final_bytes = os.path.getsize(output_path)
+        except OSError:
+            print(f"❌ [{self.camera_name}] Arquivo não foi criado")
+            return None
+        final_size = final_bytes / (1024*1024)
+        print(f"📏 [{self.camera_name}] Arquivo final: {final_size:.1f} MB, Frames: {frames_written}")
+        
+        if proc is None:
+            print(f"✅ [{self.camera_name}] Arquivo salvo sem compressão: {final_size:.1f} MB")
+            return final_bytes
+        
+        # Verificar se está dentro do limite; senão, tentar compressão mais agressiva
+        max_size_mb = self.max_file_size_mb
+        if final_size > max_size_mb:
+            print(f"   ⚠️ Arquivo ainda muito grande ({final_size:.1f}MB > {max_size_mb}MB)")
+            if not self._compress_aggressive(output_path, output_path, max_size_mb):
+                print(f"❌ [{self.camera_name}] Falha na compressão")
+                return None
+            final_bytes = os.path.getsize(output_path)
+        
+        print(f"✅ [{self.camera_name}] Arquivo final comprimido: {final_bytes / (1024*1024):.1f} MB")
+        return final_bytes
+
+    def save_last_25_seconds(self, output_path):
+        """Salva os últimos 25 segundos diretamente em formato otimizado"""
+        print(f"🎬 [{self.camera_name}] Iniciando salvamento otimizado...")
+        
+        try:
+            # Copiar apenas os índices da janela; os frames são lidos do ring buffer
+            ring, first_index, frame_count, timestamps = self._snapshot_window()
+            if frame_count == 0:
+                print(f"❌ [{self.camera_name}] Buffer vazio")
+                return False
+            print(f"📊 [{self.camera_name}] Janela do buffer: {frame_count} frames, {len(timestamps)} timestamps")
+            
+            # Verificar se há frames suficientes
+            min_frames = self.buffer_fps * 5  # Pelo menos 5 segundos
+            if frame_count < min_frames:
+                print(f"❌ [{self.camera_name}] Buffer insuficiente: {frame_count} frames (mínimo: {min_frames})")
+                return False
             
-            print(f"🔚 [{self.camera_name}] Finalizando arquivo temporário...")
-            total_time = time.time() - start_time
-            print(f"⏱️  [{self.camera_name}] Tempo total de escrita: {total_time:.1f}s")
+            # Calcular tempo real do buffer
+            if len(timestamps) > 1:
+                buffer_duration = timestamps[-1] - timestamps[0]
+                real_fps = frame_count / buffer_duration if buffer_duration > 0 else 0
+                
+                # Alertar se o buffer está muito abaixo do esperado
+                expected_duration = self.buffer_seconds
+                if buffer_duration < expected_duration * 0.8:  # 80% do esperado
+                    print(f"⚠️  [{self.camera_name}] Buffer curto - {buffer_duration:.1f}s de {expected_duration}s esperados")
+                
+                print(f"📊 [{self.camera_name}] {frame_count} frames, {buffer_duration:.1f}s, FPS real: {real_fps:.1f}")
             
-            out.release()
+            # Criar pasta se não existir
+            output_dir = os.path.dirname(output_path)
+            print(f"📁 [{self.camera_name}] Criando diretório: {output_dir}")
+            os.makedirs(output_dir, exist_ok=True)
             
-            # Verificar se o arquivo temporário foi criado
-            if os.path.exists(temp_output):
-                temp_size = os.path.getsize(temp_output) / (1024*1024)
-                print(f"📏 [{self.camera_name}] Arquivo temporário: {temp_size:.1f} MB, Frames: {frames_written}")
-                
-                # Comprimir para upload se habilitado
-                compression_enabled = os.getenv('VIDEO_COMPRESSION_ENABLED', 'true').lower() == 'true'
-                if compression_enabled:
-                    compressed_path = self.compress_video_for_upload(temp_output, output_path)
-                    
-                    # Remover arquivo temporário
-                    if os.path.exists(temp_output):
-                        os.remove(temp_output)
-                    
-                    if compressed_path and os.path.exists(compressed_path):
-                        final_size = os.path.getsize(compressed_path) / (1024*1024)
-                        print(f"✅ [{self.camera_name}] Arquivo final comprimido: {final_size:.1f} MB")
-                        return True
-                    else:
-                        print(f"❌ [{self.camera_name}] Falha na compressão")
-                        return False
-                else:
-                    # Apenas renomear arquivo temporário
-                    os.rename(temp_output, output_path)
-                    print(f"✅ [{self.camera_name}] Arquivo salvo sem compressão: {temp_size:.1f} MB")
-                    return True
-            else:
-                print(f"❌ [{self.camera_name}] Arquivo temporário não foi criado")
-                return False
+            return self._write_window(ring, first_index, frame_count, output_path) is not None
             
         except Exception as e:
             print(f"❌ [{self.camera_name}] Erro durante salvamento: {e}")
             import traceback
             traceback.print_exc()
             return False
-            
-        finally:
-            # Reativar verificações após salvamento
-            self.saving = False
-            print(f"🔓 [{self.camera_name}] Flag saving desativada")
 
 class CameraSystem:
     def __init__(self):
         self.cameras = {}
         self.running = False
+        self._env_cache = None  # ((caminho, mtime), {camera_name: url}) do último config.env lido
+        self._upload_timeout = int(os.getenv('UPLOAD_TIMEOUT_SECONDS', '300'))
+        self._camera_uuid_cache = {}  # camera_name -> UUID (estável durante a sessão)
+        self._max_parallel_uploads = max(1, int(os.getenv('MAX_PARALLEL_UPLOADS', '16')))
+        
+        # Modo sem janela: salvamentos disparados por sinal/HTTP em vez do teclado
+        self.headless = '--headless' in sys.argv or os.getenv('HEADLESS_MODE', 'false').lower() == 'true'
+        self._headless_port = int(os.getenv('HEADLESS_TRIGGER_PORT', '8765'))
+        
+        # Exclusão dos arquivos locais já enviados em segundo plano (fora do caminho dos uploads)
+        self._cleanup_queue = queue.Queue()
+        self._cleanup_thread = threading.Thread(target=self._cleanup_worker, name='local_cleanup', daemon=True)
+        self._cleanup_thread.start()
         
         # Inicializar Device Manager e QR Generator
         print("🔧 Inicializando sistema de identificação do dispositivo...")
@@ -824,12 +1407,11 @@ class CameraSystem:
     def load_config(self):
         """Carrega as configurações do arquivo config.env"""
         # Busca o config.env na pasta pai (raiz do projeto)
-        current_dir = os.path.dirname(os.path.abspath(__file__))
-        config_path = os.path.join(os.path.dirname(current_dir), "config.env")
+        config_path = os.path.join(_PROJECT_ROOT, "config.env")
         
         # Se não encontrar na pasta pai, tenta na pasta atual
         if not os.path.exists(config_path):
-            config_path = os.path.join(current_dir, "config.env")
+            config_path = os.path.join(_SRC_DIR, "config.env")
             
         if not os.path.exists(config_path):
             print(f"❌ Arquivo config.env não encontrado!")
@@ -840,39 +1422,34 @@ class CameraSystem:
         print(f"📋 Carregando configurações de: {config_path}")
             
         try:
-            with open(config_path, 'r', encoding='utf-8') as f:
-                for line_num, line in enumerate(f, 1):
-                    line = line.strip()
-                    
-                    # Ignora linhas vazias e comentários
-                    if not line or line.startswith('#'):
-                        continue
-                    
-                    # Verifica se a linha tem o formato correto
-                    if '=' not in line:
-                        print(f"⚠️  Linha {line_num} ignorada (formato inválido): {line}")
-                        continue
-                    
-                    key, value = line.split('=', 1)
-                    key = key.strip()
-                    value = value.strip()
-                    
-                    # Remove aspas se existirem
-                    if value.startswith('"') and value.endswith('"'):
-                        value = value[1:-1]
-                    elif value.startswith("'") and value.endswith("'"):
-                        value = value[1:-1]
-                    
-                    if key.startswith('IP_CAMERA_'):
-                        camera_id = key.replace('IP_CAMERA_', '').lower()
-                        camera_name = f"Camera_{camera_id}"
-                        
-                        print(f"📹 Encontrada câmera: {camera_name} -> {value}")
-                        
-                        self.cameras[camera_name] = CameraRecorder(
-                            camera_url=value,
-                            camera_name=camera_name
-                        )
+            # Reaproveitar as câmeras já lidas se o config.env não mudou
+            cache_key = (config_path, os.stat(config_path).st_mtime_ns)
+            if self._env_cache is not None and self._env_cache[0] == cache_key:
+                camera_urls = self._env_cache[1]
+            else:
+                from dotenv import dotenv_values
+                
+                # O python-dotenv já trata comentários, aspas e linhas inválidas
+                config = dotenv_values(config_path, encoding='utf-8')
+                
+                # Prefixo removido por fatia (replace varreria a chave inteira)
+                prefix = 'IP_CAMERA_'
+                prefix_len = len(prefix)
+                camera_urls = {
+                    f"Camera_{key[prefix_len:].lower()}": value
+                    for key, value in config.items()
+                    if value and key.startswith(prefix)
+                }
+                
+                self._env_cache = (cache_key, camera_urls)
+            
+            for camera_name, camera_url in camera_urls.items():
+                print(f"📹 Encontrada câmera: {camera_name} -> {camera_url}")
+                
+                self.cameras[camera_name] = CameraRecorder(
+                    camera_url=camera_url,
+                    camera_name=camera_name
+                )
                         
         except Exception as e:
             print(f"❌ Erro ao ler config.env: {e}")
@@ -894,8 +1471,6 @@ class CameraSystem:
         Returns:
             str: Nome sanitizado com underscores no lugar de espaços
         """
-        import re
-        
         if not nome:
             return "pasta_sem_nome"
         
@@ -903,22 +1478,10 @@ class CameraSystem:
         nome = str(nome)
         
         # Remover caracteres especiais e manter apenas letras, números, espaços e alguns símbolos
-        nome_limpo = re.sub(r'[^\w\s\-_.]', '', nome)
-        
-        # Substituir múltiplos espaços por um único espaço
-        nome_limpo = re.sub(r'\s+', ' ', nome_limpo)
-        
-        # Remover espaços no início e fim
-        nome_limpo = nome_limpo.strip()
-        
-        # Substituir espaços por underscores
-        nome_limpo = nome_limpo.replace(' ', '_')
+        nome_limpo = _RE_CARACTERES_INVALIDOS.sub('', nome)
         
-        # Remover múltiplos underscores consecutivos
-        nome_limpo = re.sub(r'_+', '_', nome_limpo)
-        
-        # Remover underscores no início e fim
-        nome_limpo = nome_limpo.strip('_')
+        # Sequências de espaços/underscores viram um único underscore, sem sobras nas pontas
+        nome_limpo = _RE_SEPARADORES.sub('_', nome_limpo).strip('_')
         
         # Se ficou vazio, usar nome padrão
         if not nome_limpo:
@@ -1010,23 +1573,13 @@ class CameraSystem:
         """Cria o caminho de salvamento com hierarquia de pastas"""
         now = datetime.now()
         
-        # Caminho base na raiz do projeto (pasta pai da src)
-        current_dir = os.path.dirname(os.path.abspath(__file__))
-        project_root = os.path.dirname(current_dir)
-        
-        # Hierarquia: arena_central_da_leste/quadra_da_leeste/2025/07-July/28/10h/
-        base_path = os.path.join(project_root, "arena_central_da_leste", "quadra_da_leeste")
-        year = now.strftime("%Y")
-        month = now.strftime("%m-%B")
-        day = now.strftime("%d")
-        hour = now.strftime("%Hh")
+        # Hierarquia na raiz do projeto: arena_central_da_leste/quadra_da_leeste/2025/07-July/28/10h/
+        date_folders = os.sep.join(self._path_parts(now))
         
         # Nome do arquivo com timestamp
         timestamp = now.strftime("%Y%m%d_%H%M%S")
-        filename = f"{camera_name}_{timestamp}.mp4"
         
-        full_path = os.path.join(base_path, year, month, day, hour, filename)
-        return full_path
+        return f"{_DEFAULT_BASE_PATH}{os.sep}{date_folders}{os.sep}{camera_name}_{timestamp}.mp4"
     
     def start_system(self):
         """Inicia o sistema de câmeras"""
@@ -1055,12 +1608,19 @@ class CameraSystem:
         log_success(f"✅ Sessão validada: Arena '{self.session_data['arena_info']['nome']}' / Quadra '{self.session_data['quadra_info']['nome']}'")
         log_info(f"📹 {len(self.session_data['cameras'])} câmeras registradas na sessão")
         
+        # Dividir os núcleos entre as câmeras: cada uma tem sua thread de captura (resize) e de
+        # salvamento, e o pool interno do OpenCV em cada uma causaria excesso de threads
+        cv2.setNumThreads(max(1, (os.cpu_count() or 4) // max(1, len(self.cameras))))
+        
         # Iniciar todas as câmeras
         for camera in self.cameras.values():
             if not camera.start_capture():
                 print(f"Falha ao iniciar {camera.camera_name}")
                 return False
         
+        # Detectar o encoder H.264 em segundo plano para não atrasar o primeiro salvamento
+        threading.Thread(target=detect_h264_encoder, daemon=True).start()
+        
         self.running = True
         print("\n" + "="*50)
         print("SISTEMA DE GRAVAÇÃO ATIVO")
@@ -1078,186 +1638,101 @@ class CameraSystem:
         for camera in self.cameras.values():
             camera.stop_capture()
         
+        # Imprimir as mensagens de status ainda na fila (ex.: erros de captura logo antes de parar)
+        _flush_status_messages()
+        
+        # Concluir as exclusões de arquivos locais pendentes
+        self._cleanup_queue.put(None)
+        self._cleanup_thread.join(timeout=10)
+        
+        self.supabase_manager.fechar_cliente_http()
+        
         print("Sistema parado.")
     
     def _capture_synchronized_buffer(self, camera, sync_timestamp):
         """Captura buffer sincronizado baseado no timestamp de referência"""
         try:
-            with camera.buffer_lock:
-                if len(camera.frame_buffer) == 0 or len(camera.timestamp_buffer) == 0:
-                    return None
-                
-                frames = list(camera.frame_buffer)
-                timestamps = list(camera.timestamp_buffer)
-                
-                # Encontrar o índice mais próximo do timestamp de sincronização
-                # Queremos os frames ANTES do momento da tecla 'S'
-                sync_index = len(timestamps) - 1  # Começar do final
-                
-                for i in range(len(timestamps) - 1, -1, -1):
-                    if timestamps[i] <= sync_timestamp:
-                        sync_index = i
-                        break
-                
-                # Calcular quantos frames queremos (25 segundos)
-                target_frames = camera.fps * camera.buffer_seconds
-                
-                # Determinar o índice de início
-                start_index = max(0, sync_index - target_frames + 1)
-                end_index = sync_index + 1
-                
-                # Extrair frames e timestamps sincronizados
-                sync_frames = frames[start_index:end_index]
-                sync_timestamps = timestamps[start_index:end_index]
-                
-                if len(sync_frames) > 0:
-                    buffer_duration = sync_timestamps[-1] - sync_timestamps[0] if len(sync_timestamps) > 1 else 0
-                    print(f"🎯 {camera.camera_name}: Sincronizado em {sync_timestamp:.3f}, {len(sync_frames)} frames, {buffer_duration:.1f}s")
-                    
-                    return {
-                        'frames': sync_frames,
-                        'timestamps': sync_timestamps,
-                        'sync_timestamp': sync_timestamp,
-                        'camera_name': camera.camera_name
-                    }
-                
+            # Apenas índices e timestamps são copiados sob o lock
+            ring, first_index, frame_count, timestamps = camera._snapshot_window()
+            if frame_count == 0:
                 return None
+            
+            # Encontrar o último frame capturado até o timestamp de sincronização
+            # Queremos os frames ANTES do momento da tecla 'S' (timestamps são crescentes)
+            sync_index = int(np.searchsorted(timestamps, sync_timestamp, side='right')) - 1
+            if sync_index < 0:
+                sync_index = len(timestamps) - 1  # Nenhum frame anterior: usar até o final
+            
+            # Calcular quantos frames queremos (25 segundos)
+            target_frames = camera.buffer_size
+            
+            # Determinar o índice de início
+            start_index = max(0, sync_index - target_frames + 1)
+            end_index = sync_index + 1
+            
+            # Apenas a faixa de índices é guardada; os frames são lidos do ring buffer no salvamento
+            frame_count = end_index - start_index
+            sync_timestamps = timestamps[start_index:end_index]
+            
+            if frame_count > 0:
+                buffer_duration = sync_timestamps[-1] - sync_timestamps[0] if len(sync_timestamps) > 1 else 0
+                print(f"🎯 {camera.camera_name}: Sincronizado em {sync_timestamp:.3f}, {frame_count} frames, {buffer_duration:.1f}s")
+                
+                return {
+                    'ring': ring,
+                    'frame_count': frame_count,
+                    'timestamps': sync_timestamps,
+                    'first_index': first_index + start_index,
+                    'sync_timestamp': sync_timestamp,
+                    'camera_name': camera.camera_name
+                }
+            
+            return None
                 
         except Exception as e:
             print(f"❌ Erro na sincronização do buffer {camera.camera_name}: {e}")
             return None
 
     def _save_synchronized_buffer(self, camera, sync_buffer, output_path):
-        """Salva buffer sincronizado em formato otimizado"""
-        print(f"🎬 [{camera.camera_name}] Iniciando salvamento sincronizado...")
+        """
+        Salva buffer sincronizado em formato otimizado
         
-        # Marcar que está salvando
-        camera.saving = True
-        print(f"🔒 [{camera.camera_name}] Flag saving ativada")
+        Returns:
+            int: Tamanho do arquivo salvo em bytes, ou None se o salvamento falhou
+        """
+        print(f"🎬 [{camera.camera_name}] Iniciando salvamento sincronizado...")
         
         try:
-            frames = sync_buffer['frames']
+            ring = sync_buffer['ring']
+            frame_count = sync_buffer['frame_count']
             timestamps = sync_buffer['timestamps']
+            first_index = sync_buffer['first_index']
             
             # Verificar se há frames suficientes
-            min_frames = camera.fps * 5  # Pelo menos 5 segundos
-            if len(frames) < min_frames:
-                print(f"❌ [{camera.camera_name}] Buffer insuficiente: {len(frames)} frames (mínimo: {min_frames})")
-                return False
+            min_frames = camera.buffer_fps * 5  # Pelo menos 5 segundos
+            if frame_count < min_frames:
+                print(f"❌ [{camera.camera_name}] Buffer insuficiente: {frame_count} frames (mínimo: {min_frames})")
+                return None
             
             # Calcular tempo real do buffer
             if len(timestamps) > 1:
                 buffer_duration = timestamps[-1] - timestamps[0]
-                real_fps = len(frames) / buffer_duration if buffer_duration > 0 else 0
-                print(f"📊 [{camera.camera_name}] {len(frames)} frames, {buffer_duration:.1f}s, FPS real: {real_fps:.1f}")
+                real_fps = frame_count / buffer_duration if buffer_duration > 0 else 0
+                print(f"📊 [{camera.camera_name}] {frame_count} frames, {buffer_duration:.1f}s, FPS real: {real_fps:.1f}")
             
             # Criar pasta se não existir
-            print(f"📁 [{camera.camera_name}] Criando diretório: {os.path.dirname(output_path)}")
-            os.makedirs(os.path.dirname(output_path), exist_ok=True)
-            
-            # Configurar codec otimizado
-            print(f"🎥 [{camera.camera_name}] Configurando VideoWriter otimizado...")
-            fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-            print(f"📐 [{camera.camera_name}] Resolução: {camera.frame_width}x{camera.frame_height}")
-            
-            # Usar FPS reduzido para arquivo menor
-            optimized_fps = int(os.getenv('VIDEO_FPS_UPLOAD', '15'))
-            
-            # Criar arquivo temporário primeiro
-            temp_output = output_path.replace('.mp4', '_temp.mp4')
-            out = cv2.VideoWriter(temp_output, fourcc, optimized_fps, 
-                                 (camera.frame_width, camera.frame_height))
-            
-            if not out.isOpened():
-                print(f"❌ [{camera.camera_name}] Erro ao criar VideoWriter")
-                return False
-            
-            print(f"✅ [{camera.camera_name}] VideoWriter otimizado configurado (MP4V, {optimized_fps} FPS)")
-            
-            # Calcular step para manter FPS desejado
-            frame_step = max(1, int(camera.fps / optimized_fps))
-            print(f"💾 [{camera.camera_name}] Salvando frames sincronizados (step: {frame_step})...")
-            
-            frames_written = 0
-            start_time = time.time()
-            
-            for i in range(0, len(frames), frame_step):
-                try:
-                    frame = frames[i]
-                    if frame is not None:
-                        # Verificar timeout (máximo 2 minutos)
-                        elapsed = time.time() - start_time
-                        if elapsed > 120:  # 2 minutos
-                            print(f"⏰ [{camera.camera_name}] Timeout após {elapsed:.1f}s - salvando {frames_written} frames")
-                            break
-                        
-                        # Aplicar marca d'água se habilitada
-                        if camera.watermark_manager:
-                            frame = camera.watermark_manager.apply_watermark(frame)
-                        
-                        out.write(frame)
-                        frames_written += 1
-                        
-                        # Progress report a cada 50 frames salvos
-                        if frames_written % 50 == 0:
-                            progress = (i / len(frames)) * 100
-                            elapsed = time.time() - start_time
-                            fps_write = frames_written / elapsed if elapsed > 0 else 0
-                            watermark_status = "com marca d'água" if camera.watermark_manager else "sem marca d'água"
-                            print(f"📈 [{camera.camera_name}] Progresso: {frames_written} frames salvos ({progress:.1f}%) - {fps_write:.1f} fps escrita ({watermark_status})")
-                    else:
-                        print(f"⚠️  [{camera.camera_name}] Frame {i} é None")
-                        
-                except Exception as e:
-                    print(f"❌ [{camera.camera_name}] Erro ao escrever frame {i}: {e}")
-                    continue
+            output_dir = os.path.dirname(output_path)
+            print(f"📁 [{camera.camera_name}] Criando diretório: {output_dir}")
+            os.makedirs(output_dir, exist_ok=True)
             
-            print(f"🔚 [{camera.camera_name}] Finalizando arquivo temporário...")
-            total_time = time.time() - start_time
-            print(f"⏱️  [{camera.camera_name}] Tempo total de escrita: {total_time:.1f}s")
-            
-            out.release()
-            
-            # Verificar se o arquivo temporário foi criado
-            if os.path.exists(temp_output):
-                temp_size = os.path.getsize(temp_output) / (1024*1024)
-                print(f"📏 [{camera.camera_name}] Arquivo temporário: {temp_size:.1f} MB, Frames: {frames_written}")
-                
-                # Comprimir para upload se habilitado
-                compression_enabled = os.getenv('VIDEO_COMPRESSION_ENABLED', 'true').lower() == 'true'
-                if compression_enabled:
-                    compressed_path = camera.compress_video_for_upload(temp_output, output_path)
-                    
-                    # Remover arquivo temporário
-                    if os.path.exists(temp_output):
-                        os.remove(temp_output)
-                    
-                    if compressed_path and os.path.exists(compressed_path):
-                        final_size = os.path.getsize(compressed_path) / (1024*1024)
-                        print(f"✅ [{camera.camera_name}] Arquivo final comprimido: {final_size:.1f} MB")
-                        return True
-                    else:
-                        print(f"❌ [{camera.camera_name}] Falha na compressão")
-                        return False
-                else:
-                    # Apenas renomear arquivo temporário
-                    os.rename(temp_output, output_path)
-                    print(f"✅ [{camera.camera_name}] Arquivo salvo sem compressão: {temp_size:.1f} MB")
-                    return True
-            else:
-                print(f"❌ [{camera.camera_name}] Arquivo temporário não foi criado")
-                return False
+            # Codificação única direto no arquivo final (pipe para o FFmpeg, sem arquivo temporário)
+            return camera._write_window(ring, first_index, frame_count, output_path)
             
         except Exception as e:
             print(f"❌ [{camera.camera_name}] Erro durante salvamento sincronizado: {e}")
             import traceback
             traceback.print_exc()
-            return False
-            
-        finally:
-            # Reativar verificações após salvamento
-            camera.saving = False
-            print(f"🔓 [{camera.camera_name}] Flag saving desativada")
+            return None
 
     def save_all_cameras(self):
         """Salva os últimos 25 segundos de todas as câmeras e faz upload para Supabase"""
@@ -1271,10 +1746,14 @@ class CameraSystem:
                 print("❌ Falha na inicialização do ReplayManager. Continuando sem registro de replays.")
         
         # SINCRONIZAÇÃO CRÍTICA: Capturar timestamp exato no momento da tecla 'S'
-        sync_timestamp = time.time()
+        # (monotônico, mesmo relógio dos timestamps do buffer)
+        sync_timestamp = time.monotonic()
+        key_press_time = time.time()
         now = datetime.now()
+        # Pastas ano/mês/dia/hora calculadas uma vez: caminho local e do bucket sempre coincidem
+        path_parts = self._path_parts(now)
         # Converter timestamp da tecla 'S' para UTC para uso no banco de dados
-        key_press_timestamp_utc = datetime.fromtimestamp(sync_timestamp, tz=timezone.utc)
+        key_press_timestamp_utc = datetime.fromtimestamp(key_press_time, tz=timezone.utc)
         timestamp = now.strftime("%Y%m%d_%H%M%S")
         
         print(f"🕐 Timestamp de sincronização: {sync_timestamp:.3f}")
@@ -1291,7 +1770,7 @@ class CameraSystem:
                 sync_buffer = self._capture_synchronized_buffer(camera, sync_timestamp)
                 if sync_buffer:
                     synchronized_buffers[camera_name] = sync_buffer
-                    print(f"✅ {camera_name}: Buffer sincronizado ({len(sync_buffer['frames'])} frames)")
+                    print(f"✅ {camera_name}: Buffer sincronizado ({sync_buffer['frame_count']} frames)")
                 else:
                     print(f"❌ {camera_name}: Falha na sincronização do buffer")
             except Exception as e:
@@ -1344,25 +1823,26 @@ class CameraSystem:
             
             try:
                 # OTIMIZADO: Criar caminho usando dados da sessão
-                base_path = self.create_save_path_with_names(camera.camera_name, timestamp)
+                base_path = self.create_save_path_with_names(camera.camera_name, timestamp, path_parts=path_parts)
                 output_path = base_path.replace('.mp4', '_WEB.mp4')
                 
                 # Obter nomes da sessão para log
                 arena_log = self.session_data.get('arena_info', {}).get('nome_sanitizado', 'arena_desconhecida')
                 quadra_log = self.session_data.get('quadra_info', {}).get('nome_sanitizado', 'quadra_desconhecida')
-                print(f"📁 [{camera_name}] Salvando localmente: {arena_log}/{quadra_log}/{now.strftime('%Y/%m-%B/%d/%Hh')}/")
+                print(f"📁 [{camera_name}] Salvando localmente: {arena_log}/{quadra_log}/{'/'.join(path_parts)}/")
                 
                 # Salvamento local usando buffer sincronizado
                 save_start_time = time.time()
-                if self._save_synchronized_buffer(camera, sync_buffer, output_path):
+                file_size_bytes = self._save_synchronized_buffer(camera, sync_buffer, output_path)
+                if file_size_bytes is not None:
                     save_duration = time.time() - save_start_time
-                    file_size = os.path.getsize(output_path) / (1024*1024) if os.path.exists(output_path) else 0
                     
                     return {
                         'camera_name': camera_name,
                         'success': True,
                         'output_path': output_path,
-                        'file_size': file_size,
+                        'file_size': file_size_bytes / (1024*1024),
+                        'file_size_bytes': file_size_bytes,
                         'save_duration': save_duration
                     }
                 else:
@@ -1379,8 +1859,31 @@ class CameraSystem:
                     'error': str(e)
                 }
         
+        # Uploads em paralelo (limitados por MAX_PARALLEL_UPLOADS para não sobrecarregar o Supabase),
+        # iniciados assim que cada câmera termina de salvar; todos aguardam a verificação de conectividade
+        upload_executor = None
+        connectivity_future = None
+        upload_futures = []
+        if upload_enabled:
+            upload_workers = min(self._max_parallel_uploads, len(synchronized_buffers)) + 1  # +1: conectividade
+            upload_executor = concurrent.futures.ThreadPoolExecutor(max_workers=upload_workers, thread_name_prefix='upload')
+            connectivity_future = upload_executor.submit(self.network_checker.check_full_connectivity)
+        
+        def upload_when_online(result, upload_number):
+            connectivity = connectivity_future.result()
+            if not connectivity['upload_enabled']:
+                return None
+            
+            print(f"\n☁️ Upload {upload_number}/{len(synchronized_buffers)}: {result['camera_name']}")
+            return self._upload_saved_video(result['camera_name'], result['output_path'], result['file_size_bytes'],
+                                            timestamp, key_press_timestamp_utc, path_parts)
+        
         # Executar processamento paralelo
-        with concurrent.futures.ThreadPoolExecutor(max_workers=len(synchronized_buffers)) as executor:
+        # Threads bastam: a codificação roda no processo do FFmpeg e o blending da marca d'água
+        # (numba nogil / ufuncs NumPy) e as escritas no pipe liberam o GIL. Um pool de processos
+        # exigiria copiar o ring buffer inteiro para memória compartilhada a cada salvamento.
+        with concurrent.futures.ThreadPoolExecutor(max_workers=len(synchronized_buffers),
+                                                   thread_name_prefix='save_camera') as executor:
             # Submeter todas as tarefas
             future_to_camera = {
                 executor.submit(process_camera_sync, item): item[0] 
@@ -1398,6 +1901,10 @@ class CameraSystem:
                     if result['success']:
                         print(f"✅ {result['camera_name']}: Salvamento concluído ({result['file_size']:.1f} MB em {result['save_duration']:.1f}s)")
                         saved_files.append(result['output_path'])
+                        
+                        # Upload deste arquivo em paralelo ao salvamento das demais câmeras
+                        if upload_executor is not None:
+                            upload_futures.append(upload_executor.submit(upload_when_online, result, len(upload_futures) + 1))
                     else:
                         print(f"❌ {result['camera_name']}: {result['error']}")
                         failed_cameras.append(result['camera_name'])
@@ -1408,136 +1915,58 @@ class CameraSystem:
         
         print(f"🏁 Processamento paralelo concluído: {len(saved_files)} sucessos, {len(failed_cameras)} falhas")
         
-        # ETAPA 3: Verificação de conectividade antes do upload
+        # ETAPA 3: Resultado da verificação de conectividade (feita antes do primeiro upload)
         connectivity_result = None
         if saved_files and upload_enabled:
-            log_info("🌐 Verificando conectividade de rede antes do upload...")
-            connectivity_result = self.network_checker.check_full_connectivity()
+            try:
+                connectivity_result = connectivity_future.result()
+            except Exception as e:
+                log_error(f"❌ Erro na verificação de conectividade: {e}")
+                connectivity_result = {'upload_enabled': False, 'internet_online': False,
+                                       'supabase_online': False, 'message': str(e)}
             
             if connectivity_result['upload_enabled']:
                 log_success(f"✅ {connectivity_result['message']}")
-                print(f"\n☁️ Iniciando uploads sequenciais para {len(saved_files)} arquivos...")
+                print(f"\n☁️ Uploads paralelos de {len(saved_files)} arquivos iniciados conforme o salvamento")
             else:
                 log_warning(f"⚠️ {connectivity_result['message']}")
                 print(f"\n📁 Mantendo {len(saved_files)} arquivos localmente (sistema offline)")
                 upload_enabled = False
         
-        # ETAPA 4: Upload sequencial (apenas se conectividade OK)
+        # ETAPA 4: Aguardar os uploads (apenas se conectividade OK)
         if saved_files and upload_enabled and connectivity_result and connectivity_result['upload_enabled']:
             
-            for i, output_path in enumerate(saved_files):
-                # Encontrar o resultado correspondente
-                camera_result = next((r for r in save_results if r.get('output_path') == output_path), None)
-                if not camera_result:
+            for upload_future in upload_futures:
+                try:
+                    upload_result = upload_future.result()
+                except Exception as upload_error:
+                    print(f"   ❌ Erro no upload: {upload_error}")
                     continue
-                    
-                camera_name = camera_result['camera_name']
-                camera = self.cameras[camera_name]
-                file_size = camera_result['file_size']
-                
-                print(f"\n☁️ Upload {i+1}/{len(saved_files)}: {camera_name}")
                 
+                if upload_result is not None:
+                    upload_results.append(upload_result)
+            
+            # Registros replay de todas as câmeras em uma única requisição
+            replay_cameras = [r['camera'] for r in upload_results if r.get('replay_row')]
+            replay_rows = [r.pop('replay_row') for r in upload_results if r.get('replay_row')]
+            if replay_rows:
                 try:
-                    # OTIMIZADO: Criar caminho no bucket usando dados da sessão
-                    bucket_path = self.create_bucket_path(camera.camera_name, timestamp)
-                    
-                    # Upload
-                    upload_start = time.time()
-                    upload_result = self.supabase_manager.upload_video_to_bucket(
-                        output_path, 
-                        bucket_path,
-                        timeout_seconds=int(os.getenv('UPLOAD_TIMEOUT_SECONDS', '300'))
-                    )
-                    
-                    if upload_result['success']:
-                        upload_time = upload_result['upload_time']
-                        print(f"   ✅ Upload concluído em {upload_time:.1f}s")
-                        
-                        # Verificação imediata
-                        verify_result = self.supabase_manager.verify_upload_success(
-                            bucket_path, 
-                            expected_size=int(file_size * 1024 * 1024)
-                        )
-                        
-                        if verify_result['success']:
-                            print(f"   ✅ Verificação bem-sucedida")
-                            
-                            # Registro replay (mantendo lógica existente)
-                            try:
-                                if self.replay_manager is None:
-                                    print(f"   ⚠️ ReplayManager não disponível, pulando registro")
-                                else:
-                                    camera_uuid = self._get_camera_uuid_from_name(camera_name)
-                                    public_url = upload_result.get('public_url', '')
-                                    
-                                    if not self._validar_url_completa(public_url):
-                                        print(f"   🔄 Gerando URL assinada...")
-                                        try:
-                                            signed_url = self.hierarchical_video_manager._obter_url_assinada(bucket_path)
-                                            if signed_url and self._validar_url_completa(signed_url):
-                                                public_url = signed_url
-                                                print(f"   ✅ URL assinada gerada")
-                                            else:
-                                                print(f"   ❌ Falha na URL assinada")
-                                                continue
-                                        except Exception as url_error:
-                                            print(f"   ❌ Erro na URL assinada: {url_error}")
-                                            continue
-                                    
-                                    if self._validar_url_completa(public_url):
-                                        replay_result = self.replay_manager.insert_replay_record(
-                                            camera_id=camera_uuid,
-                                            video_url=public_url,
-                                            timestamp_video=key_press_timestamp_utc,
-                                            bucket_path=bucket_path
-                                        )
-                                        
-                                        if replay_result['success']:
-                                            print(f"   📊 Registro replay inserido")
-                                        else:
-                                            print(f"   ❌ Erro no registro replay: {replay_result.get('error', 'Erro desconhecido')}")
-                                            
-                            except Exception as replay_error:
-                                print(f"   ❌ Erro no registro replay: {replay_error}")
-                            
-                            # Exclusão do arquivo local
-                            if self._excluir_arquivo_local_apos_upload(output_path, camera_name):
-                                print(f"   🗑️ Arquivo local removido")
-                                
-                            upload_results.append({
-                                'camera': camera_name,
-                                'success': True,
-                                'local_path': output_path,
-                                'bucket_path': bucket_path,
-                                'upload_time': upload_time,
-                                'file_size': file_size,
-                                'local_file_deleted': True
-                            })
-                        else:
-                            print(f"   ⚠️ Verificação falhou: {verify_result['message']}")
-                            upload_results.append({
-                                'camera': camera_name,
-                                'success': False,
-                                'error': verify_result['message'],
-                                'local_file_deleted': False
-                            })
+                    replay_result = self.replay_manager.insert_replay_records(replay_rows)
+                    if replay_result['success']:
+                        print(f"📊 {len(replay_rows)} registros replay inseridos")
+                    elif 'resultados' in replay_result:
+                        # Lote recusado e inserido registro a registro: falhas reportadas por câmera
+                        inserted = 0
+                        for camera_name, row_result in zip(replay_cameras, replay_result['resultados']):
+                            if row_result['success']:
+                                inserted += 1
+                            else:
+                                print(f"   [{camera_name}] ❌ Erro no registro replay: {row_result.get('error', 'Erro desconhecido')}")
+                        print(f"📊 {inserted}/{len(replay_rows)} registros replay inseridos")
                     else:
-                        print(f"   ❌ Upload falhou: {upload_result['message']}")
-                        upload_results.append({
-                            'camera': camera_name,
-                            'success': False,
-                            'error': upload_result['message'],
-                            'local_file_deleted': False
-                        })
-                        
-                except Exception as upload_error:
-                    print(f"   ❌ Erro no upload: {upload_error}")
-                    upload_results.append({
-                        'camera': camera_name,
-                        'success': False,
-                        'error': str(upload_error),
-                        'local_file_deleted': False
-                    })
+                        print(f"❌ Erro no registro replay: {replay_result.get('error', 'Erro desconhecido')}")
+                except Exception as replay_error:
+                    print(f"❌ Erro no registro replay: {replay_error}")
         else:
             # Sistema offline ou sem upload - criar resultados para arquivos locais
             upload_results = []
@@ -1560,13 +1989,18 @@ class CameraSystem:
                         'local_path': result['output_path']
                     })
         
+        if upload_executor is not None:
+            # Offline, as tarefas pendentes retornam logo após a verificação de conectividade
+            upload_executor.shutdown(wait=True)
+        
         # ETAPA 5: Relatório final consolidado
         print(f"\n📊 RELATÓRIO FINAL:")
         
         if saved_files:
             successful_uploads = [r for r in upload_results if r['success']]
             failed_uploads = [r for r in upload_results if not r['success']]
-            deleted_files = [r for r in upload_results if r.get('local_file_deleted', False)]
+            # A exclusão acontece em segundo plano (_cleanup_worker): aqui só se sabe que foi agendada
+            scheduled_deletions = [r for r in upload_results if r.get('local_file_delete_scheduled', False)]
             local_files = [r for r in upload_results if not r['success'] and r.get('local_path')]
             
             # Mostrar status de conectividade
@@ -1576,7 +2010,7 @@ class CameraSystem:
             
             if upload_enabled and connectivity_result and connectivity_result['upload_enabled']:
                 print(f"📊 Status: {len(saved_files)}/{len(self.cameras)} vídeos salvos localmente e {len(successful_uploads)}/{len(saved_files)} enviados para bucket")
-                print(f"🗑️ Limpeza: {len(deleted_files)}/{len(successful_uploads)} arquivos locais excluídos automaticamente")
+                print(f"🗑️ Limpeza: {len(scheduled_deletions)}/{len(successful_uploads)} arquivos locais agendados para exclusão")
                 
                 if successful_uploads:
                     total_upload_time = sum(r.get('upload_time', 0) for r in successful_uploads)
@@ -1612,6 +2046,126 @@ class CameraSystem:
         if not saved_files and not failed_cameras:
             print("❌ Nenhum arquivo foi salvo.")
 
+    def _upload_saved_video(self, camera_name, output_path, file_size_bytes, timestamp, key_press_timestamp_utc, path_parts=None):
+        """
+        Envia um vídeo salvo para o bucket, verifica o upload, prepara o registro do replay e exclui o arquivo local.
+        
+        O registro preparado vai em 'replay_row' e é inserido em lote por save_all_cameras.
+        
+        Returns:
+            dict: Resultado do upload, ou None se não houve URL válida para o registro do replay
+        """
+        camera = self.cameras[camera_name]
+        file_size = file_size_bytes / (1024*1024)
+        
+        try:
+            # OTIMIZADO: Criar caminho no bucket usando dados da sessão
+            bucket_path = self.create_bucket_path(camera.camera_name, timestamp, path_parts=path_parts)
+            
+            # Upload
+            upload_start = time.time()
+            upload_result = self.supabase_manager.upload_video_to_bucket(
+                output_path, 
+                bucket_path,
+                timeout_seconds=self._upload_timeout
+            )
+            
+            if upload_result['success']:
+                upload_time = upload_result['upload_time']
+                print(f"   [{camera_name}] ✅ Upload concluído em {upload_time:.1f}s")
+                
+                # Verificação imediata
+                verify_result = self.supabase_manager.verify_upload_success(
+                    bucket_path, 
+                    expected_size=file_size_bytes
+                )
+                
+                if verify_result['success']:
+                    print(f"   [{camera_name}] ✅ Verificação bem-sucedida")
+                    
+                    # Registro replay (inserido em lote depois de todos os uploads)
+                    replay_row = None
+                    try:
+                        if self.replay_manager is None:
+                            print(f"   [{camera_name}] ⚠️ ReplayManager não disponível, pulando registro")
+                        else:
+                            camera_uuid = self._get_camera_uuid_from_name(camera_name)
+                            public_url = upload_result.get('public_url', '')
+                            signed_url = None
+                            
+                            if not self._validar_url_completa(public_url):
+                                try:
+                                    print(f"   [{camera_name}] 🔄 Gerando URL assinada...")
+                                    # _obter_url_assinada só retorna URLs que passaram por _validar_url_completa
+                                    signed_url = self.hierarchical_video_manager._obter_url_assinada(bucket_path, expiracao_segundos=SIGNED_URL_EXPIRATION_SECONDS)
+                                    if signed_url:
+                                        public_url = signed_url
+                                        print(f"   [{camera_name}] ✅ URL assinada gerada")
+                                    else:
+                                        print(f"   [{camera_name}] ❌ Falha na URL assinada")
+                                        return None
+                                except Exception as url_error:
+                                    print(f"   [{camera_name}] ❌ Erro na URL assinada: {url_error}")
+                                    return None
+                            
+                            # Aqui a URL já é válida (pública validada acima ou assinada validada na geração)
+                            replay_result = self.replay_manager.preparar_registro_replay(
+                                camera_id=camera_uuid,
+                                video_url=public_url,
+                                timestamp_video=key_press_timestamp_utc,
+                                bucket_path=bucket_path,
+                                signed_url=signed_url
+                            )
+                            
+                            if replay_result['success']:
+                                replay_row = replay_result['replay_data']
+                            else:
+                                print(f"   [{camera_name}] ❌ Erro no registro replay: {replay_result.get('error', 'Erro desconhecido')}")
+                                    
+                    except Exception as replay_error:
+                        print(f"   [{camera_name}] ❌ Erro no registro replay: {replay_error}")
+                    
+                    # Exclusão do arquivo local (em segundo plano)
+                    self._cleanup_queue.put((output_path, camera_name))
+                    print(f"   [{camera_name}] 🗑️ Remoção do arquivo local agendada")
+                        
+                    return {
+                        'camera': camera_name,
+                        'success': True,
+                        'local_path': output_path,
+                        'bucket_path': bucket_path,
+                        'upload_time': upload_time,
+                        'file_size': file_size,
+                        'local_file_deleted': False,
+                        'local_file_delete_scheduled': True,
+                        'replay_row': replay_row
+                    }
+                else:
+                    print(f"   [{camera_name}] ⚠️ Verificação falhou: {verify_result['message']}")
+                    return {
+                        'camera': camera_name,
+                        'success': False,
+                        'error': verify_result['message'],
+                        'local_file_deleted': False
+                    }
+            else:
+                print(f"   [{camera_name}] ❌ Upload falhou: {upload_result['message']}")
+                return {
+                    'camera': camera_name,
+                    'success': False,
+                    'error': upload_result['message'],
+                    'local_file_deleted': False
+                }
+                
+        except Exception as upload_error:
+            print(f"   [{camera_name}] ❌ Erro no upload: {upload_error}")
+            return {
+                'camera': camera_name,
+                'success': False,
+                'error': str(upload_error),
+                'local_file_deleted': False
+            }
+
     def _add_to_offline_queue(self, upload_result):
         """
         Adiciona um vídeo à fila de upload offline.
@@ -1760,7 +2314,11 @@ class CameraSystem:
                 'upload_enabled': False
             }
     
-    def create_save_path_with_names(self, camera_name, timestamp, arena_nome=None, quadra_nome=None):
+    def _path_parts(self, now):
+        """Retorna (ano, mês, dia, hora) das pastas de um salvamento com uma única chamada de strftime"""
+        return tuple(now.strftime("%Y|%m-%B|%d|%Hh").split("|"))
+
+    def create_save_path_with_names(self, camera_name, timestamp, arena_nome=None, quadra_nome=None, path_parts=None):
         """Cria o caminho de salvamento com nomes da arena/quadra
         OTIMIZADO: Usa dados sanitizados da sessão (SEM consultas externas)
         
@@ -1769,38 +2327,30 @@ class CameraSystem:
             timestamp (str): Timestamp para o arquivo
             arena_nome (str, optional): Nome da arena (DEPRECATED - usa sessão)
             quadra_nome (str, optional): Nome da quadra (DEPRECATED - usa sessão)
+            path_parts (tuple, optional): (ano, mês, dia, hora) já calculados para o salvamento
         """
-        now = datetime.now()
+        if path_parts is None:
+            path_parts = self._path_parts(datetime.now())
         
         # OTIMIZAÇÃO CRÍTICA: Usar nomes sanitizados da sessão
         if hasattr(self, 'session_data') and self.session_data:
             arena_sanitizado = self.session_data.get('arena_info', {}).get('nome_sanitizado', 'arena_desconhecida')
             quadra_sanitizado = self.session_data.get('quadra_info', {}).get('nome_sanitizado', 'quadra_desconhecida')
-            log_debug(f"✅ Usando nomes da sessão: {arena_sanitizado}/{quadra_sanitizado}")
+            log_debug("✅ Usando nomes da sessão: %s/%s", arena_sanitizado, quadra_sanitizado)
         else:
             # Fallback para parâmetros (compatibilidade)
             arena_sanitizado = arena_nome or 'arena_desconhecida'
             quadra_sanitizado = quadra_nome or 'quadra_desconhecida'
             log_warning(f"⚠️ Usando fallback para nomes: {arena_sanitizado}/{quadra_sanitizado}")
         
-        # Caminho base na raiz do projeto
-        current_dir = os.path.dirname(os.path.abspath(__file__))
-        project_root = os.path.dirname(current_dir)
-        
-        # Hierarquia com nomes sanitizados
-        base_path = os.path.join(project_root, arena_sanitizado, quadra_sanitizado)
-        year = now.strftime("%Y")
-        month = now.strftime("%m-%B")
-        day = now.strftime("%d")
-        hour = now.strftime("%Hh")
+        # Hierarquia com nomes sanitizados na raiz do projeto (nenhum componente é absoluto)
+        sep = os.sep
+        date_folders = sep.join(path_parts)
         
         # Nome do arquivo com timestamp fornecido
-        filename = f"{camera_name}_{timestamp}.mp4"
-        
-        full_path = os.path.join(base_path, year, month, day, hour, filename)
-        return full_path
+        return f"{_PROJECT_ROOT}{sep}{arena_sanitizado}{sep}{quadra_sanitizado}{sep}{date_folders}{sep}{camera_name}_{timestamp}.mp4"
 
-    def create_bucket_path(self, camera_name, timestamp, arena_nome=None, quadra_nome=None):
+    def create_bucket_path(self, camera_name, timestamp, arena_nome=None, quadra_nome=None, path_parts=None):
         """Cria o caminho no bucket com estrutura hierárquica
         OTIMIZADO: Usa dados sanitizados da sessão (SEM consultas externas)
         
@@ -1809,14 +2359,16 @@ class CameraSystem:
             timestamp (str): Timestamp para o arquivo
             arena_nome (str, optional): Nome da arena (DEPRECATED - usa sessão)
             quadra_nome (str, optional): Nome da quadra (DEPRECATED - usa sessão)
+            path_parts (tuple, optional): (ano, mês, dia, hora) já calculados para o salvamento
         """
-        now = datetime.now()
+        if path_parts is None:
+            path_parts = self._path_parts(datetime.now())
         
         # OTIMIZAÇÃO CRÍTICA: Usar nomes sanitizados da sessão
         if hasattr(self, 'session_data') and self.session_data:
             arena_sanitizado = self.session_data.get('arena_info', {}).get('nome_sanitizado', 'arena_desconhecida')
             quadra_sanitizado = self.session_data.get('quadra_info', {}).get('nome_sanitizado', 'quadra_desconhecida')
-            log_debug(f"✅ Usando nomes da sessão para bucket: {arena_sanitizado}/{quadra_sanitizado}")
+            log_debug("✅ Usando nomes da sessão para bucket: %s/%s", arena_sanitizado, quadra_sanitizado)
         else:
             # Fallback para parâmetros (compatibilidade)
             arena_sanitizado = arena_nome or 'arena_desconhecida'
@@ -1824,51 +2376,116 @@ class CameraSystem:
             log_warning(f"⚠️ Usando fallback para bucket: {arena_sanitizado}/{quadra_sanitizado}")
         
         # Estrutura hierárquica no bucket
-        year = now.strftime("%Y")
-        month = now.strftime("%m-%B")
-        day = now.strftime("%d")
-        hour = now.strftime("%Hh")
+        date_folders = "/".join(path_parts)
         
         # Nome do arquivo
         filename = f"{camera_name}_{timestamp}_WEB.mp4"
         
         # Caminho completo no bucket
-        bucket_path = f"{arena_sanitizado}/{quadra_sanitizado}/{year}/{month}/{day}/{hour}/{filename}"
+        bucket_path = f"{arena_sanitizado}/{quadra_sanitizado}/{date_folders}/{filename}"
         return bucket_path
     
     def create_save_path_with_timestamp(self, camera_name, timestamp):
         """Cria o caminho de salvamento com timestamp específico"""
         now = datetime.now()
         
-        # Caminho base na raiz do projeto (pasta pai da src)
-        current_dir = os.path.dirname(os.path.abspath(__file__))
-        project_root = os.path.dirname(current_dir)
-        
-        # Hierarquia: arena_central_da_leste/quadra_da_leeste/2025/07-July/28/10h/
-        base_path = os.path.join(project_root, "arena_central_da_leste", "quadra_da_leeste")
-        year = now.strftime("%Y")
-        month = now.strftime("%m-%B")
-        day = now.strftime("%d")
-        hour = now.strftime("%Hh")
+        # Hierarquia na raiz do projeto: arena_central_da_leste/quadra_da_leeste/2025/07-July/28/10h/
+        date_folders = os.sep.join(self._path_parts(now))
         
         # Nome do arquivo com timestamp fornecido
-        filename = f"{camera_name}_{timestamp}.mp4"
+        return f"{_DEFAULT_BASE_PATH}{os.sep}{date_folders}{os.sep}{camera_name}_{timestamp}.mp4"
+    
+    def _display_worker(self, camera, display_queue, free_buffers, stop_event, backend='cpu'):
+        """
+        Busca o frame mais recente da câmera e o redimensiona para exibição, fora da thread
+        principal, que fica apenas com imshow/waitKey.
+        
+        O redimensionamento escreve em buffers pré-alocados (free_buffers), devolvidos ao
+        pool pela thread principal após o imshow. A fila é limitada: se a exibição atrasar,
+        o frame mais antigo é descartado e seu buffer volta ao pool.
         
-        full_path = os.path.join(base_path, year, month, day, hour, filename)
-        return full_path
+        Com backend 'cuda' o frame é enviado à GPU, redimensionado lá e baixado direto no
+        buffer; com 'opencl' os buffers são UMat e o imshow lê da própria UMat.
+        """
+        if backend == 'cuda':
+            # Matrizes na GPU alocadas uma única vez por câmera
+            gpu_frame = cv2.cuda_GpuMat()
+            gpu_display = cv2.cuda_GpuMat(DISPLAY_SIZE[1], DISPLAY_SIZE[0], cv2.CV_8UC3)
+        
+        last_written = -1
+        while not stop_event.is_set():
+            total_written = camera.total_written
+            frame = camera.get_latest_frame_view()
+            if frame is None or total_written == last_written:
+                # Nenhum frame novo desde o último redimensionamento
+                stop_event.wait(0.005)
+                continue
+            
+            try:
+                buffer = free_buffers.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            last_written = total_written
+            
+            if backend == 'cuda':
+                gpu_frame.upload(frame)
+                cv2.cuda.resize(gpu_frame, DISPLAY_SIZE, dst=gpu_display, interpolation=cv2.INTER_AREA)
+                display_frame = gpu_display.download(buffer)
+            elif backend == 'opencl':
+                display_frame = cv2.resize(cv2.UMat(frame), DISPLAY_SIZE, dst=buffer, interpolation=cv2.INTER_AREA)
+            else:
+                display_frame = cv2.resize(frame, DISPLAY_SIZE, dst=buffer, interpolation=cv2.INTER_AREA)
+            
+            try:
+                display_queue.put_nowait((display_frame, buffer))
+            except queue.Full:
+                try:
+                    free_buffers.put(display_queue.get_nowait()[1])
+                except queue.Empty:
+                    pass
+                display_queue.put_nowait((display_frame, buffer))
     
     def run(self):
         """Executa o loop principal do sistema"""
         # Sistema já foi iniciado na main(), apenas executar o loop
+        if self.headless:
+            return self._run_headless()
+        
+        # Pipeline de exibição: uma thread por câmera busca e redimensiona; aqui só imshow/waitKey
+        display_stop = threading.Event()
+        display_queues = {}
+        display_buffers = {}
+        display_shape = (DISPLAY_SIZE[1], DISPLAY_SIZE[0], 3)
+        resize_backend = detect_display_resize_backend()
+        for name, camera in self.cameras.items():
+            display_queues[name] = queue.Queue(maxsize=2)
+            # Pool: fila cheia + 1 frame em exibição + 1 em redimensionamento (nenhuma alocação por frame)
+            display_buffers[name] = queue.Queue()
+            for _ in range(4):
+                if resize_backend == 'opencl':
+                    display_buffers[name].put(cv2.UMat(DISPLAY_SIZE[1], DISPLAY_SIZE[0], cv2.CV_8UC3))
+                else:
+                    display_buffers[name].put(np.empty(display_shape, dtype=np.uint8))
+            threading.Thread(target=self._display_worker,
+                             args=(camera, display_queues[name], display_buffers[name], display_stop, resize_backend),
+                             name=f"display_{name}", daemon=True).start()
+        
+        first_camera = next(iter(self.cameras), None)
+        first_camera_shown = False
+        
         try:
             while self.running:
-                # Exibir frames de todas as câmeras
-                for name, camera in self.cameras.items():
-                    frame = camera.get_latest_frame()
-                    if frame is not None:
-                        # Redimensionar para exibição (opcional)
-                        display_frame = cv2.resize(frame, (960, 540))
-                        cv2.imshow(name, display_frame)
+                # Exibir os frames já redimensionados de todas as câmeras
+                for name, display_queue in display_queues.items():
+                    try:
+                        display_frame, buffer = display_queue.get_nowait()
+                    except queue.Empty:
+                        continue
+                    # imshow copia a imagem para a janela: o buffer pode voltar ao pool
+                    cv2.imshow(name, display_frame)
+                    display_buffers[name].put(buffer)
+                    if name == first_camera:
+                        first_camera_shown = True
 
                 # Verificar teclas pressionadas (1ms de delay)
                 key = cv2.waitKey(1) & 0xFF
@@ -1879,19 +2496,71 @@ class CameraSystem:
                 elif key == ord('q'):
                     break
 
-                # Fechar janelas se o 'X' for clicado
-                if len(self.cameras) > 0:
-                    first_camera = list(self.cameras.keys())[0]
-                    if cv2.getWindowProperty(first_camera, cv2.WND_PROP_VISIBLE) < 1:
-                        break
+                # Fechar janelas se o 'X' for clicado (a janela só existe após o primeiro frame)
+                if first_camera_shown and cv2.getWindowProperty(first_camera, cv2.WND_PROP_VISIBLE) < 1:
+                    break
 
         except KeyboardInterrupt:
             print("\nInterrompido pelo usuário")
         
         finally:
+            display_stop.set()
             self.stop_system()
             cv2.destroyAllWindows()
     
+    def _run_headless(self):
+        """
+        Loop principal sem janela: nenhum frame é redimensionado ou exibido.
+        
+        O salvamento é disparado por POST http://127.0.0.1:<HEADLESS_TRIGGER_PORT>/save
+        ou, onde existir (Linux), pelo sinal SIGUSR1. A thread principal só dorme até
+        o próximo pedido; os salvamentos continuam sequenciais, como no modo com janela.
+        """
+        import signal
+        from http.server import BaseHTTPRequestHandler, HTTPServer
+        
+        save_requested = threading.Event()
+        
+        class SaveTriggerHandler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                if self.path.rstrip('/') == '/save':
+                    save_requested.set()
+                    self.send_response(202)
+                else:
+                    self.send_response(404)
+                self.end_headers()
+            
+            def log_message(self, format, *args):
+                pass  # Sem log por requisição
+        
+        server = None
+        try:
+            server = HTTPServer(('127.0.0.1', self._headless_port), SaveTriggerHandler)
+            threading.Thread(target=server.serve_forever, name='save_trigger', daemon=True).start()
+            print(f"🌐 Gatilho de salvamento: POST http://127.0.0.1:{self._headless_port}/save")
+        except OSError as e:
+            log_warning(f"⚠️ Gatilho HTTP indisponível na porta {self._headless_port}: {e}")
+        
+        if hasattr(signal, 'SIGUSR1'):
+            signal.signal(signal.SIGUSR1, lambda signum, frame: save_requested.set())
+            print(f"📶 Gatilho de salvamento: kill -USR1 {os.getpid()}")
+        
+        try:
+            while self.running:
+                # Timeout curto para o Ctrl+C ser atendido também no Windows
+                if save_requested.wait(0.5):
+                    save_requested.clear()
+                    self.save_all_cameras()
+        
+        except KeyboardInterrupt:
+            print("\nInterrompido pelo usuário")
+        
+        finally:
+            if server is not None:
+                server.shutdown()
+                server.server_close()
+            self.stop_system()
+    
     def _display_device_info(self):
         """Exibe informações do Device ID e QR Code"""
         print("\n" + "="*60)
@@ -1915,7 +2584,7 @@ class CameraSystem:
         if qr_files['png_images']:
             print(f"\n🔳 QR Codes disponíveis: {len(qr_files['png_images'])} imagens")
             for png_file in qr_files['png_images']:
-                file_size = png_file.stat().st_size / 1024  # KB
+                file_size = png_file.stat().st_size / 1024  # KB (stat em cache da listagem)
                 print(f"   📱 {png_file.name} ({file_size:.1f} KB)")
         else:
             print("\n🔳 Nenhum QR Code encontrado")
@@ -1925,6 +2594,22 @@ class CameraSystem:
         print("="*60)
 
     def _get_camera_uuid_from_name(self, camera_name):
+        """
+        Obtém UUID da câmera, resolvido uma única vez por câmera durante a sessão
+        
+        Args:
+            camera_name (str): Nome da câmera (ex: "Camera_1")
+            
+        Returns:
+            str: UUID da câmera
+        """
+        camera_uuid = self._camera_uuid_cache.get(camera_name)
+        if camera_uuid is None:
+            camera_uuid = self._resolver_camera_uuid(camera_name)
+            self._camera_uuid_cache[camera_name] = camera_uuid
+        return camera_uuid
+
+    def _resolver_camera_uuid(self, camera_name):
         """
         Obtém UUID da câmera baseado no nome (Camera_1, Camera_2)
         OTIMIZADO: Usa dados em cache da sessão (SEM consultas ao Supabase)
@@ -1951,12 +2636,12 @@ class CameraSystem:
                     if not camera_uuid:
                         camera_uuid = camera_data.get('onvif_uuid')
                         if camera_uuid:
-                            log_debug(f"✅ UUID ONVIF encontrado na sessão para {camera_name}: {camera_uuid}")
+                            log_debug("✅ UUID ONVIF encontrado na sessão para %s: %s", camera_name, camera_uuid)
                             return camera_uuid
                         else:
                             log_warning(f"⚠️ Nem id nem onvif_uuid encontrados nos dados da câmera {camera_name}")
                     else:
-                        log_debug(f"✅ UUID encontrado na sessão para {camera_name}: {camera_uuid}")
+                        log_debug("✅ UUID encontrado na sessão para %s: %s", camera_name, camera_uuid)
                         return camera_uuid
                 else:
                     log_warning(f"⚠️ Índice {camera_index} fora do range para {camera_name} (total: {len(self.session_data['cameras'])})")
@@ -1964,18 +2649,8 @@ class CameraSystem:
                 log_warning("⚠️ Dados da sessão não disponíveis para busca de UUID")
             
             # Fallback: gerar UUID determinístico (mas alertar que não será encontrado)
-            import hashlib
-            import uuid
-            
-            # Criar string única combinando device_id e nome da câmera
-            unique_string = f"{self.device_id}_{camera_name}"
-            
-            # Gerar hash MD5 da string
-            hash_object = hashlib.md5(unique_string.encode())
-            hash_hex = hash_object.hexdigest()
-            
-            # Converter hash para UUID válido
-            camera_uuid = str(uuid.UUID(hash_hex))
+            # a partir da string única que combina device_id e nome da câmera
+            camera_uuid = _uuid_deterministico(f"{self.device_id}_{camera_name}")
             
             log_warning(f"⚠️ UUID determinístico gerado para {camera_name}: {camera_uuid}")
             log_warning(f"⚠️ Este UUID pode não existir na tabela cameras - registro replay pode falhar")
@@ -1985,17 +2660,17 @@ class CameraSystem:
             log_error(f"Erro ao obter UUID da câmera {camera_name}: {e}")
             
             # Fallback final: UUID baseado apenas no nome
-            import hashlib
-            import uuid
-            
-            hash_object = hashlib.md5(camera_name.encode())
-            hash_hex = hash_object.hexdigest()
-            camera_uuid = str(uuid.UUID(hash_hex))
+            camera_uuid = _uuid_deterministico(camera_name)
             
             log_error(f"❌ UUID de emergência gerado para {camera_name}: {camera_uuid}")
             log_error(f"❌ Este UUID definitivamente não existe na tabela - registro replay falhará")
             return camera_uuid
 
+    def _cleanup_worker(self):
+        """Exclui, em ordem, os arquivos locais enfileirados após upload bem-sucedido (None encerra)"""
+        for file_path, camera_name in iter(self._cleanup_queue.get, None):
+            self._excluir_arquivo_local_apos_upload(file_path, camera_name)
+
     def _excluir_arquivo_local_apos_upload(self, file_path, camera_name):
         """
         Exclui o arquivo de vídeo local após upload bem-sucedido.
@@ -2040,22 +2715,25 @@ class CameraSystem:
         """
         try:
             # Não remover a pasta raiz do projeto
-            current_dir = os.path.dirname(os.path.abspath(__file__))
-            project_root = os.path.dirname(current_dir)
+            project_root = _PROJECT_ROOT
             
             # Não remover pastas muito próximas da raiz
             if dir_path == project_root or len(os.path.relpath(dir_path, project_root).split(os.sep)) < 3:
                 return
             
-            # Verificar se a pasta está vazia
-            if os.path.exists(dir_path) and os.path.isdir(dir_path):
-                if not os.listdir(dir_path):
-                    os.rmdir(dir_path)
-                    log_debug(f"Pasta vazia removida: {dir_path}")
-                    
-                    # Verificar pasta pai recursivamente
-                    parent_dir = os.path.dirname(dir_path)
-                    self._limpar_pastas_vazias(parent_dir)
+            # Verificar se a pasta está vazia (scandir para no primeiro item, sem listar tudo)
+            try:
+                with os.scandir(dir_path) as entries:
+                    if next(entries, None) is not None:
+                        return
+            except (FileNotFoundError, NotADirectoryError):
+                return
+            
+            os.rmdir(dir_path)
+            log_debug("Pasta vazia removida: %s", dir_path)
+            
+            # Verificar pasta pai recursivamente
+            self._limpar_pastas_vazias(os.path.dirname(dir_path))
                     
         except Exception as e:
             log_debug(f"Erro ao limpar pasta vazia {dir_path}: {e}")
@@ -2070,28 +2748,7 @@ class CameraSystem:
         Returns:
             bool: True se a URL é válida
         """
-        if not url or not isinstance(url, str):
-            return False
-        
-        url = url.strip()
-        
-        # Verificar se começa com https://
-        if not url.startswith('https://'):
-            return False
-        
-        # Verificar se contém o domínio do Supabase
-        if 'supabase.co' not in url:
-            return False
-        
-        # Verificar se contém token
-        if '?token=' not in url:
-            return False
-        
-        # Verificar se não é uma URL de fallback
-        if url.startswith('supabase://bucket/'):
-            return False
-        
-        return True
+        return validar_url_completa(url)
 
 def main():
     """Função principal"""
@@ -2170,8 +2827,12 @@ def main():
         log_success("🎉 SISTEMA PRONTO!")
         print("━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━")
         print("💡 Controles:")
-        print("   • Pressione 'S' para salvar os últimos 25 segundos")
-        print("   • Pressione 'Q' para sair")
+        if system.headless:
+            print("   • Modo headless: sem janelas, salvamento via gatilho HTTP/sinal")
+            print("   • Pressione Ctrl+C para sair")
+        else:
+            print("   • Pressione 'S' para salvar os últimos 25 segundos")
+            print("   • Pressione 'Q' para sair")
         print("━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━")
         
         # Executar sistema
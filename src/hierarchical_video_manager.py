@@ -7,13 +7,190 @@ Salva localmente e faz upload para o bucket do Supabase.
 """
 
 import os
+import re
+import sys
 import json
+import time
+import queue
+import atexit
+import shutil
+import sqlite3
+import hashlib
+import logging
+import threading
+import logging.handlers
+import functools
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from datetime import datetime
 from supabase import create_client, Client
 from dotenv import load_dotenv
 from device_manager import DeviceManager
-from supabase_manager import SupabaseManager
+from supabase_manager import SupabaseManager, validar_url_completa, atraso_nova_tentativa
+
+# xxhash é opcional: hash do conteúdo dos vídeos em C (xxh3/SIMD); sem ele usa blake2b (hashlib)
+try:
+    import xxhash
+except ImportError:
+    xxhash = None
+
+# Saída do módulo: as mensagens vão para uma fila e são escritas no console por uma
+# thread de fundo, para que cópia e upload não esperem pelo stdout (console do Windows é lento)
+logger = logging.getLogger('hierarchical_video_manager')
+if not logger.handlers:
+    _fila_log = queue.Queue(-1)
+    _console_handler = logging.StreamHandler(sys.stdout)
+    _console_handler.setFormatter(logging.Formatter('%(message)s'))
+    logger.addHandler(logging.handlers.QueueHandler(_fila_log))
+    logger.setLevel(logging.INFO)  # UPLOAD_DEBUG_MODE é aplicado em _carregar_configuracoes, após ler o config.env
+    logger.propagate = False
+    _log_listener = logging.handlers.QueueListener(_fila_log, _console_handler)
+    _log_listener.start()
+    atexit.register(_log_listener.stop)  # Escreve as mensagens pendentes ao encerrar
+
+# Validade da hierarquia Totem/Quadra/Arena já verificada (praticamente imutável na sessão)
+HIERARCHY_CACHE_TTL_SECONDS = 600
+
+# Máximo de URLs assinadas mantidas em cache (as mais antigas saem primeiro)
+SIGNED_URL_CACHE_MAX = 256
+
+
+# Caracteres inválidos em nomes de pasta viram '_'; espaços e '_' repetidos viram um único '_'
+_TABELA_CARACTERES_ESPECIAIS = str.maketrans({c: '_' for c in '/\\:*?"<>|'})
+_RE_SEPARADORES = re.compile(r'[\s_]+')
+
+
+@functools.lru_cache(maxsize=128)
+def _sanitizar_nome(nome):
+    """Sanitiza um nome de pasta (memoizado: arena/quadra se repetem a cada vídeo)"""
+    return _RE_SEPARADORES.sub('_', nome.translate(_TABELA_CARACTERES_ESPECIAIS)).strip('_')
+
+
+# Bloco de leitura para o hash do conteúdo dos vídeos
+_HASH_BLOCK_SIZE = 1 << 20
+
+
+def _hash_conteudo(caminho):
+    """
+    Hash do conteúdo do arquivo, lido em blocos de 1 MB.
+    
+    O algoritmo faz parte do valor ('xxh3:...' ou 'blake2b:...'), para que índices
+    gerados com e sem xxhash instalado nunca confundam arquivos.
+    """
+    if xxhash is not None:
+        hasher, algoritmo = xxhash.xxh3_128(), 'xxh3'
+    else:
+        hasher, algoritmo = hashlib.blake2b(digest_size=16), 'blake2b'
+    
+    with open(caminho, 'rb') as arquivo:
+        for bloco in iter(lambda: arquivo.read(_HASH_BLOCK_SIZE), b''):
+            hasher.update(bloco)
+    
+    return f"{algoritmo}:{hasher.hexdigest()}"
+
+
+class _IndiceUploads:
+    """
+    Índice local (SQLite) de vídeos já enviados, pelo hash do conteúdo.
+    
+    Um vídeo idêntico a um já enviado (reenvio, reprocessamento após queda de energia)
+    reaproveita o upload anterior enquanto sua URL assinada for válida, sem nova requisição.
+    
+    Uma única conexão é mantida aberta e compartilhada entre as threads de upload
+    (check_same_thread=False), sempre acessada sob self._lock.
+    """
+    
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        try:
+            with self._conn:
+                self._conn.execute('''
+                    CREATE TABLE IF NOT EXISTS uploads (
+                        hash TEXT PRIMARY KEY,
+                        bucket_path TEXT NOT NULL,
+                        signed_url TEXT NOT NULL,
+                        expira_em REAL NOT NULL,
+                        file_size INTEGER
+                    )
+                ''')
+        except sqlite3.Error:
+            self._conn.close()
+            raise
+    
+    def buscar(self, hash_conteudo):
+        """Retorna o upload anterior com URL válida por mais 1h, ou None"""
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT bucket_path, signed_url, file_size FROM uploads WHERE hash = ? AND expira_em > ?',
+                (hash_conteudo, time.time() + 3600)
+            ).fetchone()
+        
+        if row is None:
+            return None
+        return {'bucket_path': row[0], 'signed_url': row[1], 'file_size': row[2]}
+    
+    def registrar(self, hash_conteudo, bucket_path, signed_url, expiracao_segundos, file_size):
+        """Registra (ou substitui) o upload do conteúdo"""
+        with self._lock:
+            with self._conn:
+                self._conn.execute(
+                    'INSERT OR REPLACE INTO uploads VALUES (?, ?, ?, ?, ?)',
+                    (hash_conteudo, bucket_path, signed_url, time.time() + expiracao_segundos, file_size)
+                )
+
+
+# ioctl FICLONE do Linux (reflink: cópia copy-on-write em btrfs/XFS, sem copiar dados)
+_FICLONE = 0x40049409
+
+
+def _copia_rapida(origem, destino, permitir_hardlink=False):
+    """
+    Copia o arquivo movendo o mínimo de bytes possível.
+    
+    Tenta, em ordem: reflink via FICLONE (Linux; cópia copy-on-write independente)
+    e shutil.copy2, que no Linux já copia no kernel (sendfile).
+    
+    Com permitir_hardlink=True tenta antes um hardlink (mesmo volume, instantâneo).
+    Atenção: o hardlink NÃO é uma cópia — origem e destino passam a ser o mesmo
+    inode, e qualquer escrita ou truncamento em um dos caminhos altera os dois.
+    Use apenas quando a origem não for mais modificada (ex.: será excluída logo após).
+    
+    Returns:
+        str: Método usado ('link', 'reflink' ou 'copy')
+    """
+    # Destino existente é substituído, como no copy2 (mas nunca truncando a própria origem)
+    if os.path.lexists(destino):
+        if os.path.samefile(origem, destino):
+            if permitir_hardlink:
+                return 'link'  # Já é o mesmo arquivo (hardlink de uma chamada anterior)
+            if os.path.realpath(origem) == os.path.realpath(destino):
+                raise shutil.SameFileError(f"{origem!r} e {destino!r} são o mesmo arquivo")
+        # Hardlink antigo da origem: remover só desfaz o nome extra, a origem continua intacta
+        os.remove(destino)
+    
+    if permitir_hardlink:
+        try:
+            os.link(origem, destino)
+            return 'link'
+        except OSError:
+            pass  # Outro volume ou sistema de arquivos sem hardlink (ex.: FAT32)
+    
+    try:
+        import fcntl
+        with open(origem, 'rb') as src, open(destino, 'wb') as dst:
+            fcntl.ioctl(dst.fileno(), _FICLONE, src.fileno())
+        shutil.copystat(origem, destino)
+        return 'reflink'
+    except (ImportError, OSError):
+        pass  # Windows ou sistema de arquivos sem reflink
+    
+    shutil.copy2(origem, destino)
+    return 'copy'
+
 
 class HierarchicalVideoManager:
     def __init__(self, device_manager=None):
@@ -46,6 +223,31 @@ class HierarchicalVideoManager:
         self.arena_info = None
         self.quadra_info = None
         
+        # Nomes sanitizados e modelo do nome dos arquivos, definidos ao validar a hierarquia
+        self._arena_safe = None
+        self._quadra_safe = None
+        self._fname_tpl = None
+        
+        # Última verificação de hierarquia válida (monotônico, resultado)
+        self._hierarchy_cache = {'ts': 0.0, 'result': None}
+        
+        # Pastas de hora já criadas nesta sessão (evita mkdir dos 6 níveis a cada vídeo)
+        self._created_dirs = set()
+        
+        # Cópia local por hardlink só com opt-in: o arquivo salvo compartilharia o inode da origem
+        self._permitir_hardlink = os.getenv('LOCAL_COPY_HARDLINK', 'false').lower() == 'true'
+        
+        # URLs assinadas já geradas: (bucket_path, expiração pedida) -> (URL, validade monotônica).
+        # Compartilhado pelas threads de upload: toda leitura e escrita acontece sob o lock
+        self._signed_url_cache = {}
+        self._signed_url_lock = threading.Lock()
+        
+        # Vídeos já enviados, pelo hash do conteúdo (UPLOAD_DEDUP_ENABLED=false desativa).
+        # O índice só é aberto no primeiro upload (_obter_indice_uploads)
+        self._dedup_habilitado = os.getenv('UPLOAD_DEDUP_ENABLED', 'true').lower() == 'true'
+        self._indice_uploads = None
+        self._indice_lock = threading.Lock()
+        
         # Pasta base para vídeos hierárquicos
         self.base_videos_dir = Path("Videos_Hierarquicos")
         
@@ -65,6 +267,9 @@ class HierarchicalVideoManager:
         if env_file.exists():
             load_dotenv(env_file)
         
+        # UPLOAD_DEBUG_MODE=true mostra as mensagens de debug do módulo
+        logger.setLevel(logging.DEBUG if os.getenv('UPLOAD_DEBUG_MODE', 'false').lower() == 'true' else logging.INFO)
+        
         # Obtém configurações do Supabase
         self.supabase_url = os.getenv('SUPABASE_URL')
         self.supabase_service_role_key = os.getenv('SUPABASE_SERVICE_ROLE_KEY')
@@ -73,20 +278,25 @@ class HierarchicalVideoManager:
         """
         Conecta ao Supabase usando as credenciais configuradas.
         
+        O cliente já conectado (deste gerenciador ou do SupabaseManager, com as mesmas
+        credenciais) é reaproveitado, mantendo abertas as conexões HTTPS do seu pool.
+        
         Returns:
             bool: True se conectou com sucesso, False caso contrário
         """
         try:
             if not self.supabase_url or not self.supabase_service_role_key:
-                print("❌ Configurações do Supabase não encontradas!")
+                logger.error("❌ Configurações do Supabase não encontradas!")
                 return False
             
-            self.supabase = create_client(self.supabase_url, self.supabase_service_role_key)
-            print("✅ Conectado ao Supabase para upload de vídeos!")
+            if self.supabase is None:
+                self.supabase = self.supabase_manager.supabase or create_client(
+                    self.supabase_url, self.supabase_service_role_key)
+                logger.info("✅ Conectado ao Supabase para upload de vídeos!")
             return True
             
         except Exception as e:
-            print(f"❌ Erro ao conectar no Supabase: {e}")
+            logger.error(f"❌ Erro ao conectar no Supabase: {e}")
             return False
     
     def verificar_totem_hierarquia(self):
@@ -97,6 +307,11 @@ class HierarchicalVideoManager:
         Returns:
             dict: Informações da verificação
         """
+        # Hierarquia já validada há pouco: evita reconectar e as consultas ao banco
+        cached = self._hierarchy_cache['result']
+        if cached and time.monotonic() - self._hierarchy_cache['ts'] < HIERARCHY_CACHE_TTL_SECONDS:
+            return dict(cached)
+        
         resultado = {
             'valido': False,
             'device_id': None,
@@ -107,8 +322,8 @@ class HierarchicalVideoManager:
         }
         
         try:
-            print("\n🏗️ VERIFICAÇÃO DE HIERARQUIA (Arena/Quadra)")
-            print("-" * 50)
+            logger.info("\n🏗️ VERIFICAÇÃO DE HIERARQUIA (Arena/Quadra)")
+            logger.info("-" * 50)
             
             # 1. Conecta ao Supabase
             if not self.conectar_supabase():
@@ -122,127 +337,185 @@ class HierarchicalVideoManager:
                 return resultado
             
             resultado['device_id'] = self.device_id
-            print(f"🆔 Device ID: {self.device_id}")
+            logger.info(f"🆔 Device ID: {self.device_id}")
             
-            # 3. Busca totem pelo token (device_id)
-            print("🔍 Buscando totem no banco de dados...")
-            totem_response = self.supabase.table('totens').select('*').eq('token', self.device_id).execute()
+            # 3. Busca totem pelo token (device_id), com quadra e arena embutidas pelas
+            #    chaves estrangeiras (uma única requisição ao PostgREST em vez de três)
+            logger.info("🔍 Buscando totem no banco de dados...")
+            totem_response = self.supabase.table('totens').select(
+                '*, quadra:quadras(*, arena:arenas(*))'
+            ).eq('token', self.device_id).execute()
             
             if not totem_response.data:
                 resultado['message'] = f'Totem não encontrado para o device_id: {self.device_id}'
-                print(f"❌ {resultado['message']}")
+                logger.error(f"❌ {resultado['message']}")
                 return resultado
             
             self.totem_info = totem_response.data[0]
+            quadra_embutida = self.totem_info.pop('quadra', None)
             resultado['totem_info'] = self.totem_info
-            print(f"✅ Totem encontrado: {self.totem_info['id']}")
+            logger.info(f"✅ Totem encontrado: {self.totem_info['id']}")
             
             # 4. Verifica se totem tem quadra_id preenchida
             quadra_id = self.totem_info.get('quadra_id')
             if not quadra_id:
                 resultado['message'] = 'Totem não está associado a uma quadra (quadra_id é null)'
-                print(f"❌ {resultado['message']}")
+                logger.error(f"❌ {resultado['message']}")
                 return resultado
             
-            print(f"🏟️ Quadra ID: {quadra_id}")
-            
-            # 5. Busca informações da quadra
-            print("🔍 Buscando informações da quadra...")
-            quadra_response = self.supabase.table('quadras').select('*').eq('id', quadra_id).execute()
+            logger.info(f"🏟️ Quadra ID: {quadra_id}")
             
-            if not quadra_response.data:
+            # 5. Informações da quadra (embutidas na consulta do totem)
+            if not quadra_embutida:
                 resultado['message'] = f'Quadra não encontrada: {quadra_id}'
-                print(f"❌ {resultado['message']}")
+                logger.error(f"❌ {resultado['message']}")
                 return resultado
             
-            self.quadra_info = quadra_response.data[0]
+            arena_embutida = quadra_embutida.pop('arena', None)
+            self.quadra_info = quadra_embutida
             resultado['quadra_info'] = self.quadra_info
-            print(f"✅ Quadra encontrada: {self.quadra_info['nome']}")
+            logger.info(f"✅ Quadra encontrada: {self.quadra_info['nome']}")
             
-            # 6. Busca informações da arena
+            # 6. Informações da arena (embutidas na quadra)
             arena_id = self.quadra_info['arena_id']
-            print(f"🏛️ Arena ID: {arena_id}")
-            print("🔍 Buscando informações da arena...")
+            logger.info(f"🏛️ Arena ID: {arena_id}")
             
-            arena_response = self.supabase.table('arenas').select('*').eq('id', arena_id).execute()
-            
-            if not arena_response.data:
+            if not arena_embutida:
                 resultado['message'] = f'Arena não encontrada: {arena_id}'
-                print(f"❌ {resultado['message']}")
+                logger.error(f"❌ {resultado['message']}")
                 return resultado
             
-            self.arena_info = arena_response.data[0]
+            self.arena_info = arena_embutida
             resultado['arena_info'] = self.arena_info
-            print(f"✅ Arena encontrada: {self.arena_info['nome']}")
+            
+            # Nomes usados em todas as pastas e arquivos da sessão (sanitizados uma única vez)
+            self._arena_safe = self._sanitizar_nome_pasta(self.arena_info['nome'])
+            self._quadra_safe = self._sanitizar_nome_pasta(self.quadra_info['nome'])
+            self._fname_tpl = f"{self._arena_safe}_{self._quadra_safe}_Camera{{camera_num}}_{{timestamp}}.mp4"
+            logger.info(f"✅ Arena encontrada: {self.arena_info['nome']}")
             
             # 7. Validação completa
             resultado['valido'] = True
             resultado['message'] = 'Hierarquia válida: Arena e Quadra encontradas'
             
-            print("\n🎯 HIERARQUIA VALIDADA:")
-            print(f"🏛️ Arena: {self.arena_info['nome']}")
-            print(f"🏟️ Quadra: {self.quadra_info['nome']}")
-            print(f"🤖 Totem: {self.totem_info['id']}")
-            print(f"🆔 Device ID: {self.device_id}")
+            logger.info("\n🎯 HIERARQUIA VALIDADA:")
+            logger.info(f"🏛️ Arena: {self.arena_info['nome']}")
+            logger.info(f"🏟️ Quadra: {self.quadra_info['nome']}")
+            logger.info(f"🤖 Totem: {self.totem_info['id']}")
+            logger.info(f"🆔 Device ID: {self.device_id}")
             
+            self._hierarchy_cache = {'ts': time.monotonic(), 'result': dict(resultado)}
             return resultado
             
         except Exception as e:
             resultado['message'] = f'Erro na verificação de hierarquia: {e}'
-            print(f"❌ {resultado['message']}")
+            logger.error(f"❌ {resultado['message']}")
             return resultado
     
-    def criar_estrutura_pastas_locais(self, timestamp=None):
+    def invalidar_cache_hierarquia(self):
+        """Descarta a hierarquia em cache: a próxima verificação consulta o banco novamente"""
+        self._hierarchy_cache = {'ts': 0.0, 'result': None}
+    
+    def _buscar_url_assinada(self, cache_key):
+        """Retorna a URL assinada em cache ainda válida, ou None"""
+        import time
+        
+        with self._signed_url_lock:
+            cached = self._signed_url_cache.get(cache_key)
+        if cached and cached[1] > time.monotonic():
+            return cached[0]
+        return None
+    
+    def _guardar_url_assinada(self, cache_key, url, validade):
+        """Guarda a URL assinada no cache, descartando as expiradas e as mais antigas acima do limite"""
+        import time
+        
+        with self._signed_url_lock:
+            if len(self._signed_url_cache) >= SIGNED_URL_CACHE_MAX:
+                agora = time.monotonic()
+                for chave in [k for k, (_, v) in self._signed_url_cache.items() if v <= agora]:
+                    del self._signed_url_cache[chave]
+                # Dicionário mantém a ordem de inserção: as primeiras chaves são as mais antigas
+                while len(self._signed_url_cache) >= SIGNED_URL_CACHE_MAX:
+                    del self._signed_url_cache[next(iter(self._signed_url_cache))]
+            
+            self._signed_url_cache.pop(cache_key, None)
+            self._signed_url_cache[cache_key] = (url, validade)
+    
+    def _montar_caminhos(self, camera_num, timestamp):
+        """
+        Monta, uma única vez por vídeo, os caminhos local e no bucket.
+        
+        Estrutura de 6 níveis: Arena/Quadra/Ano/MM-Month/DD/HHh, com o arquivo
+        Arena_Quadra_Camera1_YYYYMMDD_HHMMSS.mp4.
+        
+        Args:
+            camera_num (int): Número da câmera
+            timestamp (datetime): Timestamp do vídeo
+            
+        Returns:
+            dict: 'local_dir', 'bucket_path', 'filename', 'timestamp_str' e 'estrutura'
+        """
+        t = timestamp.timetuple()
+        estrutura = (f"{t.tm_year}", f"{t.tm_mon:02d}-{self.meses_ingles[t.tm_mon]}",
+                     f"{t.tm_mday:02d}", f"{t.tm_hour:02d}h")
+        timestamp_str = f"{t.tm_year}{t.tm_mon:02d}{t.tm_mday:02d}_{t.tm_hour:02d}{t.tm_min:02d}{t.tm_sec:02d}"
+        nome_arquivo = self._fname_tpl.format(camera_num=camera_num, timestamp=timestamp_str)
+        
+        return {
+            'local_dir': self.base_videos_dir.joinpath(self._arena_safe, self._quadra_safe, *estrutura),
+            'bucket_path': "/".join((self._arena_safe, self._quadra_safe) + estrutura + (nome_arquivo,)),
+            'filename': nome_arquivo,
+            'timestamp_str': timestamp_str,
+            'estrutura': "/".join(estrutura)
+        }
+    
+    def criar_estrutura_pastas_locais(self, timestamp=None, caminhos=None):
         """
         Cria a estrutura de pastas hierárquica local: Arena/Quadra/Ano/Mês/Dia/Hora
         
         Args:
             timestamp (datetime, optional): Timestamp para usar na estrutura de pastas
+            caminhos (dict, optional): Caminhos já montados por _montar_caminhos
         
         Returns:
             Path: Caminho da pasta da hora se criado com sucesso, None caso contrário
         """
         try:
             if not self.arena_info or not self.quadra_info:
-                print("❌ Informações de arena/quadra não disponíveis!")
+                logger.error("❌ Informações de arena/quadra não disponíveis!")
                 return None
             
-            # Usa timestamp fornecido ou cria um novo
-            if timestamp is None:
-                timestamp = datetime.now()
+            if caminhos is None:
+                # Usa timestamp fornecido ou cria um novo
+                if timestamp is None:
+                    timestamp = datetime.now()
+                caminhos = self._montar_caminhos(0, timestamp)
+            
+            # Nomes já sanitizados para uso em pastas (remove caracteres especiais)
+            arena_nome = self._arena_safe
+            quadra_nome = self._quadra_safe
             
-            # Sanitiza nomes para uso em pastas (remove caracteres especiais)
-            arena_nome = self._sanitizar_nome_pasta(self.arena_info['nome'])
-            quadra_nome = self._sanitizar_nome_pasta(self.quadra_info['nome'])
-            
-            # Estrutura completa de 6 níveis
-            ano = timestamp.strftime("%Y")
-            mes_num = timestamp.strftime("%m")
-            mes_nome = self.meses_ingles[int(mes_num)]
-            dia = timestamp.strftime("%d")
-            hora = timestamp.strftime("%H") + "h"
-            
-            # Cria estrutura completa: Videos_Hierarquicos/Arena/Quadra/Ano/MM-Month/DD/HHh
-            arena_dir = self.base_videos_dir / arena_nome
-            quadra_dir = arena_dir / quadra_nome
-            ano_dir = quadra_dir / ano
-            mes_dir = ano_dir / f"{mes_num}-{mes_nome}"
-            dia_dir = mes_dir / dia
-            hora_dir = dia_dir / hora
+            # Estrutura completa: Videos_Hierarquicos/Arena/Quadra/Ano/MM-Month/DD/HHh
+            hora_dir = caminhos['local_dir']
+            
+            if hora_dir in self._created_dirs:
+                return hora_dir
             
             # Cria todas as pastas
             hora_dir.mkdir(parents=True, exist_ok=True)
+            self._created_dirs.add(hora_dir)
             
-            print(f"📁 Estrutura hierárquica criada:")
-            print(f"   🏛️ Arena: {arena_nome}")
-            print(f"   🏟️ Quadra: {quadra_nome}")
-            print(f"   📅 Estrutura: {ano}/{mes_num}-{mes_nome}/{dia}/{hora}")
-            print(f"   📂 Caminho completo: {hora_dir}")
+            logger.info(f"📁 Estrutura hierárquica criada:")
+            logger.info(f"   🏛️ Arena: {arena_nome}")
+            logger.info(f"   🏟️ Quadra: {quadra_nome}")
+            logger.info(f"   📅 Estrutura: {caminhos['estrutura']}")
+            logger.info(f"   📂 Caminho completo: {hora_dir}")
             
             return hora_dir
             
         except Exception as e:
-            print(f"❌ Erro ao criar estrutura de pastas: {e}")
+            logger.error(f"❌ Erro ao criar estrutura de pastas: {e}")
             return None
     
     def _sanitizar_nome_pasta(self, nome):
@@ -255,20 +528,9 @@ class HierarchicalVideoManager:
         Returns:
             str: Nome sanitizado
         """
-        # Remove ou substitui caracteres especiais
-        caracteres_especiais = ['/', '\\', ':', '*', '?', '"', '<', '>', '|']
-        nome_limpo = nome
-        
-        for char in caracteres_especiais:
-            nome_limpo = nome_limpo.replace(char, '_')
-        
-        # Remove espaços extras e underscores duplicados
-        nome_limpo = '_'.join(nome_limpo.split())
-        nome_limpo = '_'.join(filter(None, nome_limpo.split('_')))
-        
-        return nome_limpo
+        return _sanitizar_nome(nome)
     
-    def salvar_video_local_hierarquico(self, video_path, camera_num, timestamp=None):
+    def salvar_video_local_hierarquico(self, video_path, camera_num, timestamp=None, caminhos=None):
         """
         Salva o vídeo na estrutura hierárquica local.
         
@@ -276,49 +538,48 @@ class HierarchicalVideoManager:
             video_path (str/Path): Caminho do vídeo original
             camera_num (int): Número da câmera (1 ou 2)
             timestamp (datetime, optional): Timestamp para usar no nome do arquivo
+            caminhos (dict, optional): Caminhos já montados por _montar_caminhos
             
         Returns:
             dict: Resultado da operação
         """
         try:
-            # Usa timestamp fornecido ou cria um novo
-            if timestamp is None:
-                timestamp = datetime.now()
+            if caminhos is None:
+                # Usa timestamp fornecido ou cria um novo
+                if timestamp is None:
+                    timestamp = datetime.now()
+                caminhos = self._montar_caminhos(camera_num, timestamp)
             
             # Cria estrutura de pastas
-            quadra_dir = self.criar_estrutura_pastas_locais(timestamp)
+            quadra_dir = self.criar_estrutura_pastas_locais(caminhos=caminhos)
             if not quadra_dir:
                 return {'success': False, 'error': 'Falha ao criar estrutura de pastas'}
             
-            # Gera nome do arquivo hierárquico
-            timestamp_str = timestamp.strftime("%Y%m%d_%H%M%S")
-            arena_nome = self._sanitizar_nome_pasta(self.arena_info['nome'])
-            quadra_nome = self._sanitizar_nome_pasta(self.quadra_info['nome'])
-            
             # Nome do arquivo: Arena_Quadra_Camera1_YYYYMMDD_HHMMSS.mp4
-            nome_arquivo = f"{arena_nome}_{quadra_nome}_Camera{camera_num}_{timestamp_str}.mp4"
-            caminho_destino = quadra_dir / nome_arquivo
-            
-            # Copia o arquivo para o local hierárquico
-            import shutil
-            shutil.copy2(video_path, caminho_destino)
-            
-            # Verifica se foi copiado com sucesso
-            if caminho_destino.exists():
-                file_size = caminho_destino.stat().st_size / (1024 * 1024)  # MB
-                print(f"✅ Vídeo salvo na estrutura hierárquica!")
-                print(f"📁 Local: {caminho_destino}")
-                print(f"📊 Tamanho: {file_size:.2f} MB")
-                
-                return {
-                    'success': True,
-                    'local_path': str(caminho_destino),
-                    'arena': self.arena_info['nome'],
-                    'quadra': self.quadra_info['nome'],
-                    'file_size_mb': file_size
-                }
-            else:
+            caminho_destino = quadra_dir / caminhos['filename']
+            
+            # Copia o arquivo para o local hierárquico (reflink quando possível; hardlink só com LOCAL_COPY_HARDLINK)
+            _copia_rapida(video_path, caminho_destino, permitir_hardlink=self._permitir_hardlink)
+            
+            # Verifica se foi copiado com sucesso (um único stat: existência e tamanho)
+            try:
+                file_size_bytes = os.stat(caminho_destino).st_size
+            except FileNotFoundError:
                 return {'success': False, 'error': 'Arquivo não foi copiado'}
+            
+            file_size = file_size_bytes / (1024 * 1024)  # MB
+            logger.info(f"✅ Vídeo salvo na estrutura hierárquica!")
+            logger.info(f"📁 Local: {caminho_destino}")
+            logger.info(f"📊 Tamanho: {file_size:.2f} MB")
+            
+            return {
+                'success': True,
+                'local_path': str(caminho_destino),
+                'arena': self.arena_info['nome'],
+                'quadra': self.quadra_info['nome'],
+                'file_size_mb': file_size,
+                'file_size_bytes': file_size_bytes
+            }
                 
         except Exception as e:
             return {'success': False, 'error': f'Erro ao salvar vídeo local: {e}'}
@@ -327,6 +588,9 @@ class HierarchicalVideoManager:
         """
         Obtém URL assinada para arquivo no bucket com retry.
         
+        A URL gerada é reaproveitada para o mesmo arquivo enquanto faltar mais de 1h
+        para expirar (a verificação do upload e o resultado final usam a mesma URL).
+        
         Args:
             bucket_path (str): Caminho do arquivo no bucket
             expiracao_segundos (int): Tempo de expiração em segundos (padrão: 7 dias)
@@ -337,10 +601,16 @@ class HierarchicalVideoManager:
         """
         import time
         
+        cache_key = (bucket_path, expiracao_segundos)
+        cached_url = self._buscar_url_assinada(cache_key)
+        if cached_url:
+            return cached_url
+        
         for tentativa in range(max_tentativas):
+            erro = None
             try:
                 if not self.supabase:
-                    print(f"❌ Supabase não conectado para gerar URL assinada")
+                    logger.error(f"❌ Supabase não conectado para gerar URL assinada")
                     return None
                 
                 # Gera URL assinada válida por 7 dias (604800 segundos)
@@ -358,22 +628,24 @@ class HierarchicalVideoManager:
                 
                 # Validar se a URL é completa e funcional
                 if url and self._validar_url_completa(url):
-                    print(f"✅ URL assinada gerada (tentativa {tentativa + 1}): {Path(bucket_path).name}")
+                    logger.info(f"✅ URL assinada gerada (tentativa {tentativa + 1}): {Path(bucket_path).name}")
+                    self._guardar_url_assinada(cache_key, url, time.monotonic() + expiracao_segundos - 3600)
                     return url
                 else:
-                    print(f"⚠️ URL assinada inválida na tentativa {tentativa + 1}")
+                    logger.warning(f"⚠️ URL assinada inválida na tentativa {tentativa + 1}")
                     
             except Exception as e:
-                print(f"⚠️ Erro ao gerar URL assinada (tentativa {tentativa + 1}): {e}")
+                erro = e
+                logger.warning(f"⚠️ Erro ao gerar URL assinada (tentativa {tentativa + 1}): {e}")
             
             # Aguardar antes da próxima tentativa (exceto na última)
             if tentativa < max_tentativas - 1:
-                delay = 1.0 * (tentativa + 1)  # 1s, 2s, 3s...
-                print(f"⏳ Aguardando {delay}s antes da próxima tentativa...")
+                delay = atraso_nova_tentativa(tentativa, erro)
+                logger.info(f"⏳ Aguardando {delay:.1f}s antes da próxima tentativa...")
                 time.sleep(delay)
         
         # Todas as tentativas falharam
-        print(f"❌ Falha ao gerar URL assinada após {max_tentativas} tentativas para: {bucket_path}")
+        logger.error(f"❌ Falha ao gerar URL assinada após {max_tentativas} tentativas para: {bucket_path}")
         return None
     
     def _validar_url_completa(self, url):
@@ -386,28 +658,7 @@ class HierarchicalVideoManager:
         Returns:
             bool: True se a URL é válida
         """
-        if not url or not isinstance(url, str):
-            return False
-        
-        url = url.strip()
-        
-        # Verificar se começa com https://
-        if not url.startswith('https://'):
-            return False
-        
-        # Verificar se contém o domínio do Supabase
-        if 'supabase.co' not in url:
-            return False
-        
-        # Verificar se contém token
-        if '?token=' not in url:
-            return False
-        
-        # Verificar se não é uma URL de fallback
-        if url.startswith('supabase://bucket/'):
-            return False
-        
-        return True
+        return validar_url_completa(url)
 
     def verificar_upload_completo(self, bucket_path, expected_size=None, debug_mode=True):
         """
@@ -424,30 +675,25 @@ class HierarchicalVideoManager:
         try:
             if not self.supabase:
                 if debug_mode:
-                    print(f"❌ Supabase não conectado")
+                    logger.error(f"❌ Supabase não conectado")
                 return False
             
-            import time
-            
-            # Aguarda um pouco para o upload processar completamente
-            time.sleep(0.5)
-            
             # Método simplificado: tenta obter URL assinada do arquivo (mais confiável para buckets privados)
             try:
                 signed_url = self._obter_url_assinada(bucket_path)
                 if signed_url:
                     if debug_mode:
-                        print(f"✅ Upload verificado via URL assinada: {Path(bucket_path).name}")
+                        logger.info(f"✅ Upload verificado via URL assinada: {Path(bucket_path).name}")
                     return True
             except Exception as url_error:
                 if debug_mode:
-                    print(f"⚠️ Verificação via URL falhou: {url_error}")
+                    logger.warning(f"⚠️ Verificação via URL falhou: {url_error}")
             
             # Método backup: lista arquivos no bucket
             folder_path = str(Path(bucket_path).parent)
             
             if debug_mode:
-                print(f"🔍 Verificando pasta: {folder_path}")
+                logger.info(f"🔍 Verificando pasta: {folder_path}")
             
             response = self.supabase.storage.from_(self.bucket_name).list(
                 path=folder_path
@@ -455,7 +701,7 @@ class HierarchicalVideoManager:
             
             if not response:
                 if debug_mode:
-                    print(f"❌ Nenhum arquivo encontrado na pasta: {folder_path}")
+                    logger.error(f"❌ Nenhum arquivo encontrado na pasta: {folder_path}")
                 return False
             
             # Procura pelo arquivo específico
@@ -463,7 +709,7 @@ class HierarchicalVideoManager:
             file_found = None
             
             if debug_mode:
-                print(f"🔍 Procurando arquivo: {filename} em {len(response)} itens")
+                logger.info(f"🔍 Procurando arquivo: {filename} em {len(response)} itens")
             
             for file_info in response:
                 if file_info.get('name') == filename:
@@ -472,15 +718,15 @@ class HierarchicalVideoManager:
             
             if not file_found:
                 if debug_mode:
-                    print(f"❌ Arquivo não encontrado no bucket: {filename}")
+                    logger.error(f"❌ Arquivo não encontrado no bucket: {filename}")
                     # Mostra os primeiros arquivos para debug
-                    print(f"📋 Arquivos disponíveis:")
+                    logger.info(f"📋 Arquivos disponíveis:")
                     for i, item in enumerate(response[:5]):
-                        print(f"   [{i}] {item.get('name', 'N/A')}")
+                        logger.info(f"   [{i}] {item.get('name', 'N/A')}")
                 return False
             
             if debug_mode:
-                print(f"✅ Arquivo encontrado: {filename}")
+                logger.info(f"✅ Arquivo encontrado: {filename}")
             
             # Verifica tamanho se fornecido (modo simplificado)
             if expected_size and debug_mode:
@@ -495,26 +741,26 @@ class HierarchicalVideoManager:
                     remote_size = file_found['metadata'].get('size')
                 
                 if remote_size:
-                    print(f"📊 Tamanho: local={expected_size}, remoto={remote_size}")
+                    logger.info(f"📊 Tamanho: local={expected_size}, remoto={remote_size}")
                     if abs(remote_size - expected_size) > expected_size * 0.1:  # 10% de tolerância
-                        print(f"⚠️ Diferença significativa de tamanho (>10%)")
+                        logger.warning(f"⚠️ Diferença significativa de tamanho (>10%)")
             
             if debug_mode:
-                print(f"✅ Upload verificado com sucesso: {filename}")
+                logger.info(f"✅ Upload verificado com sucesso: {filename}")
             return True
             
         except Exception as e:
             if debug_mode:
-                print(f"❌ Erro ao verificar upload: {e}")
+                logger.error(f"❌ Erro ao verificar upload: {e}")
                 import traceback
-                print(f"🔍 Stack trace: {traceback.format_exc()}")
+                logger.info(f"🔍 Stack trace: {traceback.format_exc()}")
             
             # Em caso de erro na verificação, assume sucesso (modo conservador)
             if debug_mode:
-                print(f"⚠️ Assumindo sucesso devido a erro na verificação")
+                logger.warning(f"⚠️ Assumindo sucesso devido a erro na verificação")
             return True
 
-    def upload_video_supabase(self, video_path, camera_num, timestamp=None):
+    def upload_video_supabase(self, video_path, camera_num, timestamp=None, caminhos=None, file_size=None):
         """
         Faz upload do vídeo para o bucket do Supabase na estrutura hierárquica.
         
@@ -522,6 +768,8 @@ class HierarchicalVideoManager:
             video_path (str/Path): Caminho do vídeo
             camera_num (int): Número da câmera
             timestamp (datetime, optional): Timestamp para usar no nome do arquivo
+            caminhos (dict, optional): Caminhos já montados por _montar_caminhos
+            file_size (int, optional): Tamanho do vídeo em bytes, se já conhecido
             
         Returns:
             dict: Resultado da operação
@@ -530,38 +778,50 @@ class HierarchicalVideoManager:
             if not self.supabase:
                 return {'success': False, 'error': 'Supabase não conectado'}
             
-            # Usa timestamp fornecido ou cria um novo
-            if timestamp is None:
-                timestamp = datetime.now()
-            
-            # Gera caminho hierárquico no bucket com estrutura completa de 6 níveis
-            timestamp_str = timestamp.strftime("%Y%m%d_%H%M%S")
-            arena_nome = self._sanitizar_nome_pasta(self.arena_info['nome'])
-            quadra_nome = self._sanitizar_nome_pasta(self.quadra_info['nome'])
-            
-            # Estrutura completa de 6 níveis para o bucket
-            ano = timestamp.strftime("%Y")
-            mes_num = timestamp.strftime("%m")
-            mes_nome = self.meses_ingles[int(mes_num)]
-            dia = timestamp.strftime("%d")
-            hora = timestamp.strftime("%H") + "h"
-            
-            # Nome do arquivo: Arena_Quadra_Camera1_YYYYMMDD_HHMMSS.mp4
-            nome_arquivo = f"{arena_nome}_{quadra_nome}_Camera{camera_num}_{timestamp_str}.mp4"
+            if caminhos is None:
+                # Usa timestamp fornecido ou cria um novo
+                if timestamp is None:
+                    timestamp = datetime.now()
+                caminhos = self._montar_caminhos(camera_num, timestamp)
             
             # Caminho no bucket: arena/quadra/ano/mm-month/dd/hhh/arquivo.mp4
-            bucket_path = f"{arena_nome}/{quadra_nome}/{ano}/{mes_num}-{mes_nome}/{dia}/{hora}/{nome_arquivo}"
+            bucket_path = caminhos['bucket_path']
             
-            print(f"☁️ Fazendo upload para Supabase...")
-            print(f"📂 Bucket: {self.bucket_name}")
-            print(f"📁 Caminho: {bucket_path}")
+            logger.info(f"☁️ Fazendo upload para Supabase...")
+            logger.info(f"📂 Bucket: {self.bucket_name}")
+            logger.info(f"📁 Caminho: {bucket_path}")
             
-            # Lê o arquivo
+            # Tamanho do arquivo (o conteúdo é enviado em streaming, sem ser lido inteiro)
             video_path = Path(video_path)
-            file_size = video_path.stat().st_size
-            
-            with open(video_path, 'rb') as file:
-                video_data = file.read()
+            if file_size is None:
+                file_size = os.stat(video_path).st_size
+            
+            # Conteúdo idêntico já enviado: reaproveita o upload anterior sem requisição
+            hash_conteudo = None
+            indice_uploads = self._obter_indice_uploads()
+            if indice_uploads is not None:
+                try:
+                    hash_conteudo = _hash_conteudo(video_path)
+                    anterior = indice_uploads.buscar(hash_conteudo)
+                except (OSError, sqlite3.Error) as e:
+                    logger.warning(f"⚠️ Falha ao consultar o índice de uploads: {e}")
+                    anterior = None
+                
+                if anterior:
+                    file_size_mb = file_size / (1024 * 1024)  # MB
+                    logger.info(f"✅ Conteúdo idêntico já enviado - reaproveitando upload")
+                    logger.info(f"📂 Caminho: {anterior['bucket_path']}")
+                    
+                    return {
+                        'success': True,
+                        'bucket_path': anterior['bucket_path'],
+                        'public_url': anterior['signed_url'],
+                        'arena': self.arena_info['nome'],
+                        'quadra': self.quadra_info['nome'],
+                        'file_size_mb': file_size_mb,
+                        'verified': True,
+                        'duplicate': True
+                    }
             
             # Faz upload (com tratamento de exceções do Supabase)
             upload_success = False
@@ -569,15 +829,17 @@ class HierarchicalVideoManager:
             upload_error = None
             
             try:
-                response = self.supabase.storage.from_(self.bucket_name).upload(
-                    bucket_path, 
-                    video_data,
-                    file_options={'content-type': 'video/mp4'}
+                response = self.supabase_manager.enviar_arquivo_bucket(
+                    video_path,
+                    bucket_path,
+                    self.bucket_name,
+                    file_size=file_size,
+                    timeout_seconds=int(os.getenv('UPLOAD_TIMEOUT_SECONDS', '300'))
                 )
                 upload_success = True
                 
                 # Debug: mostra resposta do upload
-                print(f"🔍 DEBUG: Resposta do upload: {response}")
+                logger.debug("🔍 DEBUG: Resposta do upload: %s", response)
                 
             except Exception as e:
                 # Captura exceções do Supabase Storage
@@ -586,17 +848,18 @@ class HierarchicalVideoManager:
                 
                 # Verifica se é erro de duplicata
                 if ('409' in error_str or 'Duplicate' in error_str or 'already exists' in error_str):
-                    print(f"✅ Arquivo já existe no bucket - considerando como sucesso")
-                    print(f"📂 Caminho: {bucket_path}")
+                    logger.info(f"✅ Arquivo já existe no bucket - considerando como sucesso")
+                    logger.info(f"📂 Caminho: {bucket_path}")
                     
                     # Obtém URL assinada do arquivo existente
                     public_url = self._obter_url_assinada(bucket_path)
+                    self._registrar_upload(hash_conteudo, bucket_path, public_url, file_size)
                     
                     file_size_mb = file_size / (1024 * 1024)  # MB
                     
-                    print(f"✅ Arquivo duplicado tratado como sucesso!")
-                    print(f"🌐 URL: {public_url}")
-                    print(f"📊 Tamanho: {file_size_mb:.2f} MB")
+                    logger.info(f"✅ Arquivo duplicado tratado como sucesso!")
+                    logger.info(f"🌐 URL: {public_url}")
+                    logger.info(f"📊 Tamanho: {file_size_mb:.2f} MB")
                     
                     return {
                         'success': True,
@@ -610,34 +873,34 @@ class HierarchicalVideoManager:
                     }
                 else:
                     # Outro tipo de erro
-                    print(f"🔍 DEBUG: Erro no upload: {e}")
+                    logger.error(f"❌ Erro no upload: {e}")
                     return {'success': False, 'error': f'Erro no upload: {e}'}
             
             # Se chegou aqui, upload foi bem-sucedido
             if not upload_success:
                 return {'success': False, 'error': 'Upload falhou por motivo desconhecido'}
             
-            # Verificação de integridade do upload
-            print(f"🔍 Verificando integridade do upload...")
-            
-            # Usa debug mode baseado em configuração de ambiente
-            import os
-            debug_mode = os.getenv('UPLOAD_DEBUG_MODE', 'True').lower() == 'true'
-            
-            upload_verified = self.verificar_upload_completo(bucket_path, file_size, debug_mode)
+            # O Storage só responde sucesso depois de gravar o objeto: a verificação extra
+            # (URL assinada/listagem da pasta) fica como diagnóstico opcional
+            debug_mode = os.getenv('UPLOAD_DEBUG_MODE', 'false').lower() == 'true'
             
-            if not upload_verified:
-                print(f"⚠️ Verificação falhou, mas upload pode ter sido bem-sucedido")
-                # Não falha mais automaticamente - continua o processo
+            if debug_mode:
+                logger.info(f"🔍 Verificando integridade do upload...")
+                upload_verified = self.verificar_upload_completo(bucket_path, file_size, debug_mode)
+                
+                if not upload_verified:
+                    logger.warning(f"⚠️ Verificação falhou, mas upload pode ter sido bem-sucedido")
+                    # Não falha mais automaticamente - continua o processo
             
             # Obtém URL assinada
             public_url = self._obter_url_assinada(bucket_path)
+            self._registrar_upload(hash_conteudo, bucket_path, public_url, file_size)
             
             file_size_mb = file_size / (1024 * 1024)  # MB
             
-            print(f"✅ Upload concluído e verificado!")
-            print(f"🌐 URL: {public_url}")
-            print(f"📊 Tamanho: {file_size_mb:.2f} MB")
+            logger.info(f"✅ Upload concluído e verificado!")
+            logger.info(f"🌐 URL: {public_url}")
+            logger.info(f"📊 Tamanho: {file_size_mb:.2f} MB")
             
             return {
                 'success': True,
@@ -652,6 +915,35 @@ class HierarchicalVideoManager:
         except Exception as e:
             return {'success': False, 'error': f'Erro no upload: {e}'}
     
+    def _obter_indice_uploads(self):
+        """
+        Retorna o índice de deduplicação, aberto uma única vez no primeiro upload.
+        
+        Returns:
+            _IndiceUploads: Índice, ou None se a deduplicação estiver desativada/indisponível
+        """
+        if self._indice_uploads is not None or not self._dedup_habilitado:
+            return self._indice_uploads
+        
+        with self._indice_lock:
+            if self._indice_uploads is None and self._dedup_habilitado:
+                try:
+                    self._indice_uploads = _IndiceUploads(os.path.join(os.getcwd(), 'offline_data', 'upload_index.db'))
+                except (OSError, sqlite3.Error) as e:
+                    logger.warning(f"⚠️ Índice de uploads indisponível (sem deduplicação): {e}")
+                    self._dedup_habilitado = False  # Não tenta abrir de novo a cada upload
+            return self._indice_uploads
+    
+    def _registrar_upload(self, hash_conteudo, bucket_path, public_url, file_size, expiracao_segundos=604800):
+        """Registra o upload no índice de deduplicação (ignorado sem hash ou sem URL)"""
+        if not hash_conteudo or not public_url or self._indice_uploads is None:
+            return
+        
+        try:
+            self._indice_uploads.registrar(hash_conteudo, bucket_path, public_url, expiracao_segundos, file_size)
+        except sqlite3.Error as e:
+            logger.warning(f"⚠️ Falha ao registrar upload no índice: {e}")
+    
     def processar_video_completo(self, video_path, camera_num, timestamp=None):
         """
         Processa um vídeo de forma completa: verifica hierarquia, salva local e faz upload.
@@ -677,8 +969,8 @@ class HierarchicalVideoManager:
             if timestamp is None:
                 timestamp = datetime.now()
                 
-            print(f"\n🎬 PROCESSAMENTO COMPLETO - CÂMERA {camera_num}")
-            print("=" * 50)
+            logger.info(f"\n🎬 PROCESSAMENTO COMPLETO - CÂMERA {camera_num}")
+            logger.info("=" * 50)
             
             # 1. Verifica hierarquia
             hierarchy_check = self.verificar_totem_hierarquia()
@@ -686,45 +978,53 @@ class HierarchicalVideoManager:
             
             if not hierarchy_check['valido']:
                 resultado['message'] = f"Gravação não permitida: {hierarchy_check['message']}"
-                print(f"\n❌ {resultado['message']}")
+                logger.error(f"\n❌ {resultado['message']}")
                 return resultado
             
-            print(f"\n✅ Hierarquia válida! Processando vídeo...")
+            logger.info(f"\n✅ Hierarquia válida! Processando vídeo...")
+            
+            # Caminhos local e no bucket e tamanho do vídeo obtidos uma única vez para as duas etapas
+            caminhos = self._montar_caminhos(camera_num, timestamp)
+            file_size = os.stat(video_path).st_size
+            
+            # 2 e 3. Salva localmente e faz upload para o Supabase ao mesmo tempo:
+            # ambos leem o vídeo original (disco x rede) e não dependem um do outro
+            logger.info(f"\n💾 SALVANDO LOCALMENTE E ☁️ ENVIANDO PARA SUPABASE...")
+            with ThreadPoolExecutor(max_workers=2, thread_name_prefix='processar_video') as executor:
+                local_future = executor.submit(self.salvar_video_local_hierarquico, video_path, camera_num,
+                                               timestamp, caminhos)
+                upload_future = executor.submit(self.upload_video_supabase, video_path, camera_num,
+                                                timestamp, caminhos, file_size)
+                local_result = local_future.result()
+                upload_result = upload_future.result()
             
-            # 2. Salva localmente
-            print(f"\n💾 SALVANDO LOCALMENTE...")
-            local_result = self.salvar_video_local_hierarquico(video_path, camera_num, timestamp)
             resultado['local_save'] = local_result
+            resultado['upload'] = upload_result
             
             if not local_result['success']:
                 resultado['message'] = f"Falha ao salvar localmente: {local_result['error']}"
-                print(f"❌ {resultado['message']}")
+                logger.error(f"❌ {resultado['message']}")
                 return resultado
             
-            # 3. Faz upload para Supabase
-            print(f"\n☁️ UPLOAD PARA SUPABASE...")
-            upload_result = self.upload_video_supabase(video_path, camera_num, timestamp)
-            resultado['upload'] = upload_result
-            
             if not upload_result['success']:
                 resultado['message'] = f"Falha no upload: {upload_result['error']}"
-                print(f"⚠️ {resultado['message']} (arquivo salvo localmente)")
+                logger.warning(f"⚠️ {resultado['message']} (arquivo salvo localmente)")
                 # Não retorna aqui - arquivo foi salvo localmente
             
             resultado['success'] = True
             resultado['message'] = "Vídeo processado com sucesso!"
             
-            print(f"\n🎉 PROCESSAMENTO CONCLUÍDO!")
-            print(f"🏛️ Arena: {self.arena_info['nome']}")
-            print(f"🏟️ Quadra: {self.quadra_info['nome']}")
-            print(f"💾 Salvo localmente: {'✅' if local_result['success'] else '❌'}")
-            print(f"☁️ Upload Supabase: {'✅' if upload_result['success'] else '❌'}")
+            logger.info(f"\n🎉 PROCESSAMENTO CONCLUÍDO!")
+            logger.info(f"🏛️ Arena: {self.arena_info['nome']}")
+            logger.info(f"🏟️ Quadra: {self.quadra_info['nome']}")
+            logger.info(f"💾 Salvo localmente: {'✅' if local_result['success'] else '❌'}")
+            logger.info(f"☁️ Upload Supabase: {'✅' if upload_result['success'] else '❌'}")
             
             return resultado
             
         except Exception as e:
             resultado['message'] = f'Erro no processamento: {e}'
-            print(f"❌ {resultado['message']}")
+            logger.error(f"❌ {resultado['message']}")
             return resultado
     
     def pode_gravar(self):
@@ -761,33 +1061,33 @@ def main():
     """
     Função principal para testar o gerenciador hierárquico.
     """
-    print("🏗️ TESTE DO GERENCIADOR HIERÁRQUICO DE VÍDEOS")
-    print("=" * 60)
-    print()
+    logger.info("🏗️ TESTE DO GERENCIADOR HIERÁRQUICO DE VÍDEOS")
+    logger.info("=" * 60)
+    logger.info("")
     
     # Cria uma instância do gerenciador
     video_manager = HierarchicalVideoManager()
     
     # Verifica se pode gravar
     if video_manager.pode_gravar():
-        print("✅ SISTEMA AUTORIZADO PARA GRAVAÇÃO!")
+        logger.info("✅ SISTEMA AUTORIZADO PARA GRAVAÇÃO!")
         
         # Mostra informações da hierarquia
         info = video_manager.obter_info_hierarquia()
         if info:
-            print(f"\n📋 INFORMAÇÕES DA HIERARQUIA:")
-            print(f"🏛️ Arena: {info['arena']['nome']}")
-            print(f"🏟️ Quadra: {info['quadra']['nome']}")
-            print(f"🆔 Device ID: {info['device_id']}")
+            logger.info(f"\n📋 INFORMAÇÕES DA HIERARQUIA:")
+            logger.info(f"🏛️ Arena: {info['arena']['nome']}")
+            logger.info(f"🏟️ Quadra: {info['quadra']['nome']}")
+            logger.info(f"🆔 Device ID: {info['device_id']}")
             
         # Cria estrutura de pastas
         pasta_quadra = video_manager.criar_estrutura_pastas_locais()
         if pasta_quadra:
-            print(f"\n📁 Pasta da quadra: {pasta_quadra}")
+            logger.info(f"\n📁 Pasta da quadra: {pasta_quadra}")
             
     else:
-        print("❌ SISTEMA NÃO AUTORIZADO PARA GRAVAÇÃO!")
-        print("Verifique se o totem está associado a uma arena e quadra no banco de dados.")
+        logger.error("❌ SISTEMA NÃO AUTORIZADO PARA GRAVAÇÃO!")
+        logger.info("Verifique se o totem está associado a uma arena e quadra no banco de dados.")
 
 
 if __name__ == "__main__":
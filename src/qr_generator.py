@@ -5,6 +5,7 @@ Gerador de QR Code para Device ID
 Gera QR code do Device ID e salva como imagem PNG e arquivo base64.
 """
 
+import os
 import qrcode
 import json
 import base64
@@ -248,15 +249,31 @@ class QRCodeGenerator:
         """
         Lista todos os QR codes gerados.
         
+        Uma única leitura do diretório (os.scandir) classifica os três tipos de arquivo.
+        Os itens são os os.DirEntry da leitura: .name, .path e .stat() (tamanho já
+        obtido na listagem, sem nova chamada ao sistema no Windows).
+        
         Returns:
             dict: Lista de arquivos QR code encontrados
         """
         qr_files = {
-            "png_images": list(self.output_dir.glob("*.png")),
-            "base64_files": list(self.output_dir.glob("*base64.txt")),
-            "info_files": list(self.output_dir.glob("*info.json"))
+            "png_images": [],
+            "base64_files": [],
+            "info_files": []
         }
         
+        try:
+            with os.scandir(self.output_dir) as entries:
+                for entry in entries:
+                    if entry.name.endswith(".png"):
+                        qr_files["png_images"].append(entry)
+                    elif entry.name.endswith("base64.txt"):
+                        qr_files["base64_files"].append(entry)
+                    elif entry.name.endswith("info.json"):
+                        qr_files["info_files"].append(entry)
+        except FileNotFoundError:
+            pass
+        
         return qr_files
 
 
@@ -11,11 +11,12 @@ import uuid
 import time
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Dict, Any, Optional, Union
+from typing import Dict, Any, List, Optional, Union
 from dotenv import load_dotenv
 
 # Importações do sistema existente
 from system_logger import log_info, log_success, log_warning, log_error, log_debug, system_logger
+from supabase_manager import validar_url_completa, atraso_nova_tentativa
 
 
 class ReplayManager:
@@ -156,6 +157,7 @@ class ReplayManager:
             str: URL assinada completa ou None se falhar
         """
         for tentativa in range(max_tentativas):
+            erro = None
             try:
                 if not self.supabase:
                     log_error("Supabase não conectado para gerar URL assinada")
@@ -182,12 +184,13 @@ class ReplayManager:
                     log_warning(f"URL assinada inválida na tentativa {tentativa + 1}")
                     
             except Exception as e:
+                erro = e
                 log_warning(f"Erro ao gerar URL assinada (tentativa {tentativa + 1}): {e}")
             
             # Aguardar antes da próxima tentativa (exceto na última)
             if tentativa < max_tentativas - 1:
-                delay = 1.0 * (tentativa + 1)  # 1s, 2s, 3s...
-                log_debug(f"Aguardando {delay}s antes da próxima tentativa...")
+                delay = atraso_nova_tentativa(tentativa, erro)
+                log_debug("Aguardando %.1fs antes da próxima tentativa...", delay)
                 time.sleep(delay)
         
         # Todas as tentativas falharam
@@ -204,38 +207,18 @@ class ReplayManager:
         Returns:
             bool: True se a URL é válida
         """
-        if not url or not isinstance(url, str):
-            return False
-        
-        url = url.strip()
-        
-        # Verificar se começa com https://
-        if not url.startswith('https://'):
-            return False
-        
-        # Verificar se contém o domínio do Supabase
-        if 'supabase.co' not in url:
-            return False
-        
-        # Verificar se contém token
-        if '?token=' not in url:
-            return False
-        
-        # Verificar se não é uma URL de fallback
-        if url.startswith('supabase://bucket/'):
-            return False
-        
-        return True
+        return validar_url_completa(url)
     
-    def _inserir_com_retry(self, replay_data: Dict[str, Any]) -> Dict[str, Any]:
+    def _inserir_com_retry(self, replay_data: Union[Dict[str, Any], List[Dict[str, Any]]]) -> Dict[str, Any]:
         """
         Insere registro na tabela replays com sistema de retry.
         
         Args:
-            replay_data (dict): Dados do replay para inserir
+            replay_data (dict | list): Dados do replay para inserir, ou lista de registros
+                inseridos em uma única requisição
             
         Returns:
-            dict: Resultado da operação
+            dict: Resultado da operação ('replay_ids' quando uma lista é inserida)
         """
         last_error = None
         
@@ -247,7 +230,16 @@ class ReplayManager:
                 # Tentativa de inserção
                 response = self.supabase.table('replays').insert(replay_data).execute()
                 
-                if response.data:
+                if response.data and isinstance(replay_data, list):
+                    replay_ids = [registro['id'] for registro in response.data]
+                    log_success(f"{len(replay_ids)} registros replay inseridos (tentativa {tentativa + 1})")
+                    return {
+                        'success': True,
+                        'replay_ids': replay_ids,
+                        'data': response.data,
+                        'tentativa': tentativa + 1
+                    }
+                elif response.data:
                     replay_inserido = response.data[0]
                     log_success(f"Registro replay inserido (tentativa {tentativa + 1})")
                     log_debug(f"Replay ID: {replay_inserido['id']}")
@@ -274,22 +266,22 @@ class ReplayManager:
         log_error(f"Falha após {self.max_retries + 1} tentativas: {last_error}")
         return {'success': False, 'error': last_error, 'tentativas': self.max_retries + 1}
     
-    def insert_replay_record(self, camera_id: str, video_url: str, timestamp_video: datetime, bucket_path: str) -> Dict[str, Any]:
+    def preparar_registro_replay(self, camera_id: str, video_url: str, timestamp_video: datetime, bucket_path: str,
+                                 signed_url: Optional[str] = None) -> Dict[str, Any]:
         """
-        Insere um novo registro na tabela replays apenas com URLs completas.
+        Valida os dados e monta o registro da tabela replays (sem inserir).
         
         Args:
             camera_id (str): UUID da câmera
             video_url (str): URL do vídeo original (deve ser URL completa)
             timestamp_video (datetime): Momento da gravação (deve estar em UTC)
             bucket_path (str): Caminho no bucket para gerar URL assinada
+            signed_url (str, optional): URL assinada já gerada para bucket_path (evita nova requisição)
             
         Returns:
-            dict: Resultado da operação
+            dict: {'success': True, 'replay_data': {...}} ou o erro da validação
         """
         try:
-            log_info(f"Inserindo registro replay para câmera: {camera_id[:8]}...")
-            
             # ETAPA 1: Validação de dados
             validacao = self._validar_dados_replay(camera_id, video_url, timestamp_video, bucket_path)
             if not validacao['success']:
@@ -301,8 +293,9 @@ class ReplayManager:
                 log_error(f"video_url não é uma URL completa: {video_url}")
                 return {'success': False, 'error': 'video_url deve ser uma URL completa e funcional'}
             
-            # ETAPA 3: Gerar URL assinada (deve ser completa)
-            signed_url = self._obter_url_assinada(bucket_path)
+            # ETAPA 3: Gerar URL assinada (deve ser completa), se não foi fornecida
+            if not signed_url:
+                signed_url = self._obter_url_assinada(bucket_path)
             if not signed_url:
                 log_error("Não foi possível gerar URL assinada válida - abortando inserção")
                 return {'success': False, 'error': 'Falha ao gerar URL assinada válida'}
@@ -324,12 +317,38 @@ class ReplayManager:
                 'updated_at': datetime.now(timezone.utc).isoformat()
             }
             
-            log_debug(f"Dados preparados para inserção: camera_id={camera_id}, status=concluido")
-            log_debug(f"video_url: {video_url[:50]}...")
-            log_debug(f"public_video_url: {signed_url[:50]}...")
+            log_debug("Dados preparados para inserção: camera_id=%s, status=concluido", camera_id)
+            log_debug("video_url: %s...", video_url[:50])
+            log_debug("public_video_url: %s...", signed_url[:50])
+            
+            return {'success': True, 'replay_data': replay_data}
+            
+        except Exception as e:
+            log_error(f"Erro ao preparar registro replay: {e}")
+            return {'success': False, 'error': f'Erro inesperado: {e}'}
+    
+    def insert_replay_record(self, camera_id: str, video_url: str, timestamp_video: datetime, bucket_path: str) -> Dict[str, Any]:
+        """
+        Insere um novo registro na tabela replays apenas com URLs completas.
+        
+        Args:
+            camera_id (str): UUID da câmera
+            video_url (str): URL do vídeo original (deve ser URL completa)
+            timestamp_video (datetime): Momento da gravação (deve estar em UTC)
+            bucket_path (str): Caminho no bucket para gerar URL assinada
+            
+        Returns:
+            dict: Resultado da operação
+        """
+        try:
+            log_info(f"Inserindo registro replay para câmera: {camera_id[:8]}...")
+            
+            preparado = self.preparar_registro_replay(camera_id, video_url, timestamp_video, bucket_path)
+            if not preparado['success']:
+                return preparado
             
             # ETAPA 6: Inserir com retry
-            resultado = self._inserir_com_retry(replay_data)
+            resultado = self._inserir_com_retry(preparado['replay_data'])
             
             if resultado['success']:
                 log_success(f"Registro replay criado com sucesso: {resultado['replay_id'][:8]}...")
@@ -341,6 +360,43 @@ class ReplayManager:
             log_error(f"Erro ao inserir registro replay: {e}")
             return {'success': False, 'error': f'Erro inesperado: {e}'}
     
+    def insert_replay_records(self, replay_rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Insere vários registros (montados por preparar_registro_replay) em uma única requisição.
+        
+        Se o lote falhar (ex.: um registro com camera_id inexistente recusa a requisição
+        inteira), os registros são inseridos um a um, para que só os inválidos se percam.
+        
+        Args:
+            replay_rows (list): Registros da tabela replays
+            
+        Returns:
+            dict: Resultado da operação, com 'replay_ids' na ordem dos registros; após o
+                fallback, 'resultados' traz o resultado de cada registro (mesma ordem)
+        """
+        if not replay_rows:
+            return {'success': True, 'replay_ids': [], 'data': []}
+        
+        try:
+            log_info(f"Inserindo {len(replay_rows)} registros replay em lote...")
+            resultado = self._inserir_com_retry(list(replay_rows))
+            if resultado['success'] or len(replay_rows) == 1:
+                return resultado
+            
+            log_warning(f"Lote de registros replay recusado ({resultado.get('error')}) - inserindo um a um")
+            resultados = [self._inserir_com_retry(row) for row in replay_rows]
+            falhas = sum(1 for r in resultados if not r['success'])
+            return {
+                'success': falhas == 0,
+                'replay_ids': [r.get('replay_id') for r in resultados],
+                'resultados': resultados,
+                'error': f'{falhas}/{len(replay_rows)} registros não inseridos' if falhas else None
+            }
+            
+        except Exception as e:
+            log_error(f"Erro ao inserir registros replay em lote: {e}")
+            return {'success': False, 'error': f'Erro inesperado: {e}'}
+    
     def update_public_video_url(self, replay_id: str, public_video_url: str, watermark_status: str = 'completed') -> Dict[str, Any]:
         """
         Atualiza a URL pública do vídeo quando a marca d'água estiver pronta.
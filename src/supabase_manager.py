@@ -11,13 +11,72 @@ import uuid
 import json
 import time
 import re
+import math
+import random
+import threading
 from datetime import datetime, timedelta, timezone
 from pathlib import Path
+import httpx
 from supabase import create_client, Client
 from dotenv import load_dotenv
 from device_manager import DeviceManager
 from system_logger import system_logger, log_debug, log_info, log_warning, log_error, log_success
 
+# URL completa e funcional: https://<projeto>.supabase.co/...?token=...
+_RE_URL_COMPLETA = re.compile(r'^https://[^/\s]*supabase\.co/[^?]*\?token=.+')
+
+
+def validar_url_completa(url):
+    """
+    Valida se a URL é completa e funcional.
+    
+    Args:
+        url (str): URL para validar
+        
+    Returns:
+        bool: True se a URL é válida
+    """
+    if not url or not isinstance(url, str):
+        return False
+    
+    # https:// + domínio do Supabase + token (URLs de fallback supabase:// não casam)
+    return _RE_URL_COMPLETA.match(url.strip()) is not None
+
+
+# Backoff exponencial com jitter completo nas novas tentativas de URL assinada
+_RETRY_DELAY_BASE = 0.2
+_RETRY_DELAY_MAX = 4.0
+_RETRY_AFTER_MAX = 30.0
+
+
+def atraso_nova_tentativa(tentativa, erro=None):
+    """
+    Atraso antes da próxima tentativa: o Retry-After da resposta de erro, se houver;
+    senão um valor aleatório entre 0 e 0.2s·2^tentativa (máx. 4s), para que vários
+    totens não repitam a requisição ao mesmo tempo durante uma instabilidade.
+    
+    Args:
+        tentativa (int): Índice da tentativa que falhou (0 = primeira)
+        erro (Exception, optional): Erro da tentativa, consultado pelo Retry-After
+        
+    Returns:
+        float: Segundos a aguardar (sempre finito e não negativo)
+    """
+    resposta = getattr(erro, 'response', None)
+    retry_after = getattr(resposta, 'headers', {}).get('Retry-After') if resposta is not None else None
+    if retry_after:
+        try:
+            segundos = float(retry_after)
+        except (TypeError, ValueError):
+            segundos = None  # Retry-After em formato de data HTTP: usa o backoff
+        
+        # Valores negativos, nan ou inf fariam o time.sleep falhar (ou esperar para sempre)
+        if segundos is not None and math.isfinite(segundos):
+            return max(0.0, min(segundos, _RETRY_AFTER_MAX))
+    
+    return random.uniform(0, min(_RETRY_DELAY_MAX, _RETRY_DELAY_BASE * 2 ** tentativa))
+
+
 class SupabaseManager:
     def __init__(self, device_manager=None):
         """
@@ -41,6 +100,10 @@ class SupabaseManager:
         self.supabase = None
         self.device_id = None
         
+        # Cliente HTTP dos uploads, compartilhado entre uploads e reconexões (keep-alive)
+        self._http = None
+        self._http_lock = threading.Lock()
+        
         # Conecta automaticamente ao Supabase
         self.conectar_supabase()
         
@@ -61,10 +124,16 @@ class SupabaseManager:
         self.supabase_anon_key = os.getenv('SUPABASE_ANON_KEY')
         self.supabase_service_role_key = os.getenv('SUPABASE_SERVICE_ROLE_KEY')
         
-    def conectar_supabase(self):
+    def conectar_supabase(self, forcar=False):
         """
         Conecta ao Supabase usando as credenciais configuradas.
         
+        Um cliente já conectado é reaproveitado (suas conexões HTTPS continuam no pool),
+        a menos que forcar=True.
+        
+        Args:
+            forcar (bool): Cria um novo cliente mesmo se já houver um conectado
+        
         Returns:
             bool: True se conectou com sucesso, False caso contrário
         """
@@ -77,7 +146,8 @@ class SupabaseManager:
                 return False
             
             # Usa a service role key para operações de inserção
-            self.supabase = create_client(self.supabase_url, self.supabase_service_role_key)
+            if self.supabase is None or forcar:
+                self.supabase = create_client(self.supabase_url, self.supabase_service_role_key)
             return True
             
         except Exception as e:
@@ -1092,6 +1162,77 @@ class SupabaseManager:
             log_error(f"Erro ao buscar nomes da arena/quadra: {e}")
             return resultado
 
+    def _obter_cliente_http(self):
+        """
+        Retorna o cliente HTTP dos uploads, criado uma única vez.
+        
+        O pool mantém as conexões TLS com o Storage abertas entre uploads; com o
+        pacote h2 instalado, os uploads simultâneos compartilham uma conexão HTTP/2.
+        
+        Returns:
+            httpx.Client: Cliente HTTP (thread-safe)
+        """
+        if self._http is not None:
+            return self._http
+        
+        with self._http_lock:
+            if self._http is None:
+                # Conexões ociosas mantidas por 60s (o padrão de 5s as fecharia entre salvamentos próximos)
+                limits = httpx.Limits(max_connections=32, max_keepalive_connections=16, keepalive_expiry=60)
+                try:
+                    self._http = httpx.Client(http2=True, limits=limits)
+                except ImportError:
+                    self._http = httpx.Client(limits=limits)  # Sem h2: HTTP/1.1 com keep-alive
+            return self._http
+    
+    def fechar_cliente_http(self):
+        """Fecha as conexões mantidas pelo cliente HTTP dos uploads"""
+        with self._http_lock:
+            if self._http is not None:
+                self._http.close()
+                self._http = None
+    
+    def enviar_arquivo_bucket(self, video_path, bucket_path, bucket_name, file_size=None, timeout_seconds=300):
+        """
+        Envia um arquivo ao Storage pelo cliente HTTP compartilhado, em streaming.
+        
+        O arquivo é lido em blocos enquanto é enviado (memória constante, sem carregar
+        o vídeo inteiro) e a conexão com o Storage é reaproveitada entre uploads.
+        
+        Args:
+            video_path (str/Path): Caminho local do arquivo
+            bucket_path (str): Caminho no bucket
+            bucket_name (str): Nome do bucket
+            file_size (int, optional): Tamanho em bytes, se já conhecido
+            timeout_seconds (int): Timeout para o envio
+            
+        Returns:
+            httpx.Response: Resposta do Storage
+            
+        Raises:
+            Exception: Resposta de erro do Storage ('<status>: <corpo>')
+        """
+        if file_size is None:
+            file_size = os.path.getsize(video_path)
+        
+        upload_url = f"{self.supabase_url.rstrip('/')}/storage/v1/object/{bucket_name}/{bucket_path}"
+        upload_headers = {
+            'Authorization': f'Bearer {self.supabase_service_role_key}',
+            'apikey': self.supabase_service_role_key,
+            'Content-Type': 'video/mp4',
+            'Content-Length': str(file_size),  # Corpo enviado em streaming, sem chunked encoding
+            'Cache-Control': 'max-age=3600',
+            'x-upsert': 'false'
+        }
+        
+        with open(video_path, 'rb') as file:
+            response = self._obter_cliente_http().post(upload_url, content=file, headers=upload_headers,
+                                                       timeout=httpx.Timeout(timeout_seconds, connect=10))
+        
+        if response.is_error:
+            raise Exception(f'{response.status_code}: {response.text}')
+        return response
+    
     def upload_video_to_bucket(self, video_path, bucket_path, timeout_seconds=300):
         """
         Faz upload do vídeo para o bucket do Supabase com retry e verificação de tamanho.
@@ -1144,43 +1285,13 @@ class SupabaseManager:
                 try:
                     start_time = time.time()
                     
-                    # Ler arquivo
-                    with open(video_path, 'rb') as file:
-                        file_data = file.read()
-                    
-                    # Upload para o bucket
-                    upload_response = self.supabase.storage.from_(bucket_name).upload(
-                        path=bucket_path,
-                        file=file_data,
-                        file_options={
-                            "content-type": "video/mp4",
-                            "cache-control": "3600"
-                        }
-                    )
+                    # Upload para o bucket em streaming (cada tentativa reabre o arquivo);
+                    # erros HTTP seguem o mesmo tratamento das exceções (413, 409/duplicata, retry)
+                    self.enviar_arquivo_bucket(video_path, bucket_path, bucket_name, file_size, timeout_seconds)
                     
                     upload_time = time.time() - start_time
                     resultado['upload_time'] = upload_time
                     
-                    # Verificar se o upload foi bem-sucedido
-                    if hasattr(upload_response, 'error') and upload_response.error:
-                        error_msg = str(upload_response.error)
-                        
-                        # Verificar se é erro de tamanho
-                        if 'Payload too large' in error_msg or '413' in error_msg:
-                            resultado['message'] = f'Arquivo muito grande para o bucket ({file_size_mb:.1f}MB)'
-                            resultado['error_code'] = 413
-                            return resultado
-                        
-                        if attempt < max_retries and enable_retry:
-                            wait_time = (attempt + 1) * 2  # Backoff exponencial
-                            log_warning(f"Tentativa {attempt + 1} falhou, tentando novamente em {wait_time}s...")
-                            time.sleep(wait_time)
-                            continue
-                        else:
-                            resultado['message'] = f'Erro no upload: {error_msg}'
-                            resultado['attempt'] = attempt + 1
-                            return resultado
-                    
                     resultado['success'] = True
                     resultado['message'] = f'Upload concluído em {upload_time:.1f}s'
                     resultado['attempt'] = attempt + 1
@@ -55,6 +55,10 @@ class SystemLogger:
         """Define se deve mostrar logs detalhados"""
         self.verbose_mode = verbose
     
+    def is_debug_enabled(self) -> bool:
+        """Indica se logs de debug serão exibidos (evita formatar mensagens descartadas)"""
+        return self.verbose_mode
+    
     def clear_cache(self):
         """
         Limpa o cache de verificações para nova execução
@@ -121,17 +125,21 @@ class SystemLogger:
         """Marca uma etapa de inicialização como completa"""
         self.initialization_steps[step] = success
         
-    def log(self, level: LogLevel, message: str, emoji: str = None):
+    def log(self, level: LogLevel, message: str, emoji: str = None, args: tuple = ()):
         """
         Log com níveis e formatação consistente
         
         Args:
             level: Nível do log
-            message: Mensagem
+            message: Mensagem (com placeholders %s quando args é informado)
             emoji: Emoji opcional
+            args: Argumentos da mensagem, formatados apenas se o log for exibido
         """
         if not self.verbose_mode and level == LogLevel.DEBUG:
             return
+        
+        if args:
+            message = message % args
             
         # Emojis padrão por nível
         level_emojis = {
@@ -150,26 +158,26 @@ class SystemLogger:
 system_logger = SystemLogger()
 
 
-def log_debug(message: str, emoji: str = None):
+def log_debug(message: str, *args, emoji: str = None):
     """Shortcut para log de debug"""
-    system_logger.log(LogLevel.DEBUG, message, emoji)
+    system_logger.log(LogLevel.DEBUG, message, emoji, args)
 
 
-def log_info(message: str, emoji: str = None):
+def log_info(message: str, *args, emoji: str = None):
     """Shortcut para log de info"""
-    system_logger.log(LogLevel.INFO, message, emoji)
+    system_logger.log(LogLevel.INFO, message, emoji, args)
 
 
-def log_warning(message: str, emoji: str = None):
+def log_warning(message: str, *args, emoji: str = None):
     """Shortcut para log de warning"""
-    system_logger.log(LogLevel.WARNING, message, emoji)
+    system_logger.log(LogLevel.WARNING, message, emoji, args)
 
 
-def log_error(message: str, emoji: str = None):
+def log_error(message: str, *args, emoji: str = None):
     """Shortcut para log de error"""
-    system_logger.log(LogLevel.ERROR, message, emoji)
+    system_logger.log(LogLevel.ERROR, message, emoji, args)
 
 
-def log_success(message: str, emoji: str = None):
+def log_success(message: str, *args, emoji: str = None):
     """Shortcut para log de success"""
-    system_logger.log(LogLevel.SUCCESS, message, emoji)
\ No newline at end of file
+    system_logger.log(LogLevel.SUCCESS, message, emoji, args)
\ No newline at end of file
@@ -11,6 +11,26 @@ import os
 from pathlib import Path
 import time
 
+# numba é opcional: compila o alpha blending da região da marca d'água; sem ele usa NumPy
+try:
+    import numba
+except ImportError:
+    numba = None
+
+
+if numba is not None:
+    @numba.njit(cache=True, nogil=True, fastmath=True)
+    def _blend_region(region, premultiplied, inv_alpha):
+        """(region * (256 - a) + wm * a) >> 8 in-place, pixel a pixel e sem segurar o GIL"""
+        height, width = region.shape[:2]
+        for y in range(height):
+            for x in range(width):
+                inv = inv_alpha[y, x, 0]
+                for c in range(3):
+                    region[y, x, c] = (region[y, x, c] * inv + premultiplied[y, x, c]) >> 8
+else:
+    _blend_region = None
+
 
 class WatermarkManager:
     def __init__(self, watermark_path=None):
@@ -23,7 +43,7 @@ class WatermarkManager:
         # Carregar configurações do ambiente
         # Cache para otimização
         self._watermark_cache = {}
-        self._background_cache = {}
+        self._background_cache = {}  # Fundo pré-multiplicado e alpha inverso (uint16) por resolução
         
         # Configurações do config.env
         self.navy_blue = (139, 69, 19)  # BGR format - azul marinho
@@ -194,12 +214,42 @@ class WatermarkManager:
         
         return result
     
-    def apply_watermark(self, frame):
+    def _get_cached_blend(self, frame_height, frame_width):
+        """
+        Obtém os termos pré-calculados do alpha blending para o tamanho do frame
+        
+        O alpha (0-255) é escalado para 0-256, permitindo dividir por 256 com shift
+        sem escurecer as regiões totalmente opacas ou transparentes.
+        
+        Returns:
+            tuple: (fundo pré-multiplicado uint16, alpha inverso uint16, x_pos, y_pos)
+        """
+        cache_key = f"{frame_width}x{frame_height}"
+        
+        if cache_key in self._background_cache:
+            return self._background_cache[cache_key]
+        
+        watermark_with_bg, x_pos, y_pos = self._get_cached_watermark(frame_height, frame_width)
+        
+        alpha = watermark_with_bg[:, :, 3:4].astype(np.uint16)
+        alpha += alpha >> 7  # 255 -> 256
+        
+        premultiplied = watermark_with_bg[:, :, :3].astype(np.uint16) * alpha
+        inv_alpha = 256 - alpha
+        
+        result = (premultiplied, inv_alpha, x_pos, y_pos)
+        self._background_cache[cache_key] = result
+        
+        return result
+    
+    def apply_watermark(self, frame, out=None):
         """
         Aplica marca d'água no frame de forma otimizada
         
         Args:
             frame (numpy.ndarray): Frame do vídeo (BGR)
+            out (numpy.ndarray): Buffer reutilizável (mesmo shape do frame) para o resultado;
+                se None, uma cópia do frame é alocada
             
         Returns:
             numpy.ndarray: Frame com marca d'água aplicada
@@ -209,35 +259,36 @@ class WatermarkManager:
         
         frame_height, frame_width = frame.shape[:2]
         
-        # Obter marca d'água em cache
-        watermark_with_bg, x_pos, y_pos = self._get_cached_watermark(frame_height, frame_width)
+        # Obter termos do blending em cache
+        premultiplied, inv_alpha, x_pos, y_pos = self._get_cached_blend(frame_height, frame_width)
         
         # Verificar se a marca d'água cabe no frame
-        wm_height, wm_width = watermark_with_bg.shape[:2]
+        wm_height, wm_width = premultiplied.shape[:2]
         
         if x_pos < 0 or y_pos < 0 or x_pos + wm_width > frame_width or y_pos + wm_height > frame_height:
             # Frame muito pequeno, pular marca d'água
             return frame
         
-        # Criar cópia do frame para não modificar o original
-        result_frame = frame.copy()
+        # Copiar o frame para o buffer de saída (ou nova cópia) para não modificar o original
+        if out is None:
+            result_frame = frame.copy()
+        else:
+            np.copyto(out, frame)
+            result_frame = out
         
-        # Extrair região do frame onde a marca d'água será aplicada
+        # Região do frame (view) onde a marca d'água será aplicada
         frame_region = result_frame[y_pos:y_pos+wm_height, x_pos:x_pos+wm_width]
         
-        # Aplicar marca d'água usando alpha blending otimizado
-        alpha = watermark_with_bg[:, :, 3] / 255.0
-        alpha_inv = 1.0 - alpha
-        
-        # Aplicar para cada canal BGR
-        for c in range(3):
-            frame_region[:, :, c] = (
-                alpha * watermark_with_bg[:, :, c] +
-                alpha_inv * frame_region[:, :, c]
-            ).astype(np.uint8)
+        if _blend_region is not None:
+            _blend_region(frame_region, premultiplied, inv_alpha)
+            return result_frame
         
-        # Aplicar região modificada de volta ao frame
-        result_frame[y_pos:y_pos+wm_height, x_pos:x_pos+wm_width] = frame_region
+        # Alpha blending inteiro vetorizado: (frame * (256 - a) + wm * a) >> 8
+        blended = frame_region.astype(np.uint16)
+        blended *= inv_alpha
+        blended += premultiplied
+        blended >>= 8
+        np.copyto(frame_region, blended, casting='unsafe')
         
         return result_frame
     